@@ -9,6 +9,7 @@ from app.crud.user import (
 )
 from app.auth.security import create_access_token
 from app.core.dependencies import get_current_active_user
+from app.core.concurrency import run_db, run_hash
 from pymongo.errors import DuplicateKeyError
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -18,17 +19,17 @@ router = APIRouter(prefix="/auth", tags=["auth"])
     "/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED
 )
 async def register(user: UserCreate):
-    if get_user_by_username(user.username):
+    if await run_db(get_user_by_username, user.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered",
         )
-    if get_user_by_email(user.email):
+    if await run_db(get_user_by_email, user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
         )
     try:
-        new_user = create_user(user)
+        new_user = await run_hash(create_user, user)
         return UserResponse(
             _id=new_user.id,
             username=new_user.username,
@@ -44,7 +45,7 @@ async def register(user: UserCreate):
 
 @router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await run_hash(authenticate_user, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Any
 from app.models.models import UserInDB, DashboardConfig, VisualizationWidget
 from app.core.dependencies import get_current_active_user
+from app.core.concurrency import run_db, run_cpu
+from app.core.http import cache_headers, etag_matches, make_etag, not_modified
+from app.core.workers import submit_snapshot_refresh
 from app.crud.dashboard import (
     create_dashboard,
     get_dashboard_by_id,
@@ -10,8 +14,19 @@ from app.crud.dashboard import (
     update_dashboard,
     delete_dashboard,
     get_dashboard_data,
+    get_dashboard_snapshot,
+    snapshot_is_current,
+    claim_snapshot_refresh,
+    refresh_dashboard_snapshot,
+    dashboard_version,
 )
-from app.crud.data import get_data_metadata_by_id, get_data_template_by_id
+from app.crud.data import (
+    get_data_metadata_by_id,
+    get_data_template_by_id,
+    dataset_version,
+)
+from app.crud.filters import validate_filters, has_relative_window
+from app.settings import settings
 
 router = APIRouter(prefix="/dashboards", tags=["dashboards"])
 
@@ -21,11 +36,13 @@ class DashboardCreate(BaseModel):
     data_id: str
     name: str = Field(..., min_length=1, max_length=100)
     widgets: List[dict[str, Any]]
+    materialized: bool = False
 
 
 class DashboardUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=100)
     widgets: Optional[List[dict[str, Any]]] = None
+    materialized: Optional[bool] = None
 
 
 class DashboardResponse(BaseModel):
@@ -36,6 +53,7 @@ class DashboardResponse(BaseModel):
     name: str
     layout_type: str
     widgets: List[dict[str, Any]]
+    materialized: bool = False
     created_at: str
     updated_at: str
 
@@ -43,12 +61,44 @@ class DashboardResponse(BaseModel):
         populate_by_name = True
 
 
+async def schedule_snapshot_refresh(dashboard_id: str) -> None:
+    # Only the caller that wins the claim queues work, so a burst of reads
+    # of a stale dashboard triggers a single refresh
+    if await run_db(claim_snapshot_refresh, dashboard_id):
+        submit_snapshot_refresh(dashboard_id)
+
+
+def check_widget_filters(widgets: Optional[List[dict[str, Any]]]) -> None:
+    for widget in widgets or []:
+        try:
+            validate_filters(widget.get("filters"))
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid filters in widget {widget.get('title', '')}: {e}",
+            )
+
+
+def check_materializable(materialized: bool, widgets: List[Any]) -> None:
+    # A snapshot only goes stale when the dashboard or dataset changes, so it
+    # would freeze a "last" window at the time it was computed
+    if not materialized:
+        return
+    for widget in widgets:
+        filters = widget.get("filters") if isinstance(widget, dict) else widget.filters
+        if has_relative_window(filters):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Dashboards with relative time window filters cannot be materialized",
+            )
+
+
 @router.post("/", response_model=DashboardResponse, status_code=status.HTTP_201_CREATED)
 async def create_new_dashboard(
     dashboard_data: DashboardCreate,
     current_user: UserInDB = Depends(get_current_active_user),
 ):
-    metadata = get_data_metadata_by_id(dashboard_data.data_id)
+    metadata = await run_db(get_data_metadata_by_id, dashboard_data.data_id)
     if not metadata:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -61,7 +111,7 @@ async def create_new_dashboard(
             detail="Not authorized to use this data",
         )
 
-    template = get_data_template_by_id(dashboard_data.template_id)
+    template = await run_db(get_data_template_by_id, dashboard_data.template_id)
     if not template:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -74,13 +124,20 @@ async def create_new_dashboard(
             detail="Not authorized to use this template",
         )
 
-    dashboard = create_dashboard(
+    check_widget_filters(dashboard_data.widgets)
+    check_materializable(dashboard_data.materialized, dashboard_data.widgets or [])
+
+    dashboard = await run_db(
+        create_dashboard,
         user_id=current_user.id,
         template_id=dashboard_data.template_id,
         data_id=dashboard_data.data_id,
         name=dashboard_data.name,
         widgets=dashboard_data.widgets,
+        materialized=dashboard_data.materialized,
     )
+    if dashboard.materialized:
+        await schedule_snapshot_refresh(dashboard.id)
 
     return DashboardResponse(
         _id=dashboard.id,
@@ -90,25 +147,39 @@ async def create_new_dashboard(
         name=dashboard.name,
         layout_type=dashboard.layout_type,
         widgets=[w.dict() if hasattr(w, "dict") else w for w in dashboard.widgets],
+        materialized=dashboard.materialized,
         created_at=dashboard.created_at.isoformat(),
         updated_at=dashboard.updated_at.isoformat(),
     )
 
 
 @router.get("/", response_model=List[DashboardResponse])
-async def list_dashboards(current_user: UserInDB = Depends(get_current_active_user)):
-    dashboards = list_dashboards_by_user(current_user.id)
+async def list_dashboards(
+    response: Response,
+    limit: int = Query(settings.PAGE_DEFAULT_LIMIT, ge=1, le=settings.PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    try:
+        dashboards, next_cursor = await run_db(
+            list_dashboards_by_user, current_user.id, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return [
         DashboardResponse(
-            _id=d.id,
-            user_id=d.user_id,
-            template_id=d.template_id,
-            data_id=d.data_id,
-            name=d.name,
-            layout_type=d.layout_type,
-            widgets=[w.dict() if hasattr(w, "dict") else w for w in d.widgets],
-            created_at=d.created_at.isoformat(),
-            updated_at=d.updated_at.isoformat(),
+            _id=d["_id"],
+            user_id=d["user_id"],
+            template_id=d["template_id"],
+            data_id=d["data_id"],
+            name=d["name"],
+            layout_type=d.get("layout_type", "default_6"),
+            widgets=d["widgets"],
+            materialized=d.get("materialized", False),
+            created_at=d["created_at"].isoformat(),
+            updated_at=d["updated_at"].isoformat(),
         )
         for d in dashboards
     ]
@@ -119,7 +190,7 @@ async def get_dashboard(
     dashboard_id: str,
     current_user: UserInDB = Depends(get_current_active_user),
 ):
-    dashboard = get_dashboard_by_id(dashboard_id)
+    dashboard = await run_db(get_dashboard_by_id, dashboard_id)
     if not dashboard:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -140,6 +211,7 @@ async def get_dashboard(
         name=dashboard.name,
         layout_type=dashboard.layout_type,
         widgets=[w.dict() if hasattr(w, "dict") else w for w in dashboard.widgets],
+        materialized=dashboard.materialized,
         created_at=dashboard.created_at.isoformat(),
         updated_at=dashboard.updated_at.isoformat(),
     )
@@ -151,7 +223,7 @@ async def update_existing_dashboard(
     dashboard_data: DashboardUpdate,
     current_user: UserInDB = Depends(get_current_active_user),
 ):
-    existing = get_dashboard_by_id(dashboard_id)
+    existing = await run_db(get_dashboard_by_id, dashboard_id)
     if not existing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -164,10 +236,22 @@ async def update_existing_dashboard(
             detail="Not authorized to modify this dashboard",
         )
 
-    updated = update_dashboard(
+    check_widget_filters(dashboard_data.widgets)
+    check_materializable(
+        (
+            existing.materialized
+            if dashboard_data.materialized is None
+            else dashboard_data.materialized
+        ),
+        existing.widgets if dashboard_data.widgets is None else dashboard_data.widgets,
+    )
+
+    updated = await run_db(
+        update_dashboard,
         dashboard_id=dashboard_id,
         name=dashboard_data.name,
         widgets=dashboard_data.widgets,
+        materialized=dashboard_data.materialized,
     )
 
     if not updated:
@@ -175,6 +259,8 @@ async def update_existing_dashboard(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No fields to update",
         )
+    if updated.materialized:
+        await schedule_snapshot_refresh(updated.id)
 
     return DashboardResponse(
         _id=updated.id,
@@ -184,6 +270,7 @@ async def update_existing_dashboard(
         name=updated.name,
         layout_type=updated.layout_type,
         widgets=[w.dict() if hasattr(w, "dict") else w for w in updated.widgets],
+        materialized=updated.materialized,
         created_at=updated.created_at.isoformat(),
         updated_at=updated.updated_at.isoformat(),
     )
@@ -194,7 +281,7 @@ async def delete_existing_dashboard(
     dashboard_id: str,
     current_user: UserInDB = Depends(get_current_active_user),
 ):
-    existing = get_dashboard_by_id(dashboard_id)
+    existing = await run_db(get_dashboard_by_id, dashboard_id)
     if not existing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -207,7 +294,7 @@ async def delete_existing_dashboard(
             detail="Not authorized to delete this dashboard",
         )
 
-    deleted = delete_dashboard(dashboard_id)
+    deleted = await run_db(delete_dashboard, dashboard_id)
     if not deleted:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -218,9 +305,11 @@ async def delete_existing_dashboard(
 @router.get("/{dashboard_id}/data")
 async def get_dashboard_visualization_data(
     dashboard_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: UserInDB = Depends(get_current_active_user),
 ):
-    dashboard = get_dashboard_by_id(dashboard_id)
+    dashboard = await run_db(get_dashboard_by_id, dashboard_id)
     if not dashboard:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -233,8 +322,27 @@ async def get_dashboard_visualization_data(
             detail="Not authorized to access this dashboard",
         )
 
+    # Relative date windows move with the clock, so their results have no
+    # version to validate against, nor a snapshot that stays current
+    relative = any(has_relative_window(w.filters) for w in dashboard.widgets)
+    if dashboard.materialized and not relative:
+        return await get_materialized_dashboard_data(dashboard, if_none_match)
+
+    headers = {}
+    if not relative:
+        metadata = await run_db(get_data_metadata_by_id, dashboard.data_id)
+        headers = cache_headers(
+            make_etag(
+                dashboard_version(dashboard),
+                dataset_version(metadata) if metadata else None,
+            )
+        )
+        if etag_matches(if_none_match, headers["ETag"]):
+            return not_modified(headers)
+
     try:
-        data = get_dashboard_data(dashboard_id)
+        data = await run_cpu(get_dashboard_data, dashboard_id)
+        response.headers.update(headers)
         return data
     except ValueError as e:
         raise HTTPException(
@@ -246,3 +354,35 @@ async def get_dashboard_visualization_data(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error processing dashboard data: {str(e)}",
         )
+
+
+async def get_materialized_dashboard_data(
+    dashboard: DashboardConfig, if_none_match: Optional[str]
+) -> Response:
+    snapshot = await run_db(get_dashboard_snapshot, dashboard.id, with_payload=False)
+    if snapshot is None:
+        # First read: compute inline, later refreshes happen in the background
+        try:
+            snapshot = await run_cpu(refresh_dashboard_snapshot, dashboard.id)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e),
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error processing dashboard data: {str(e)}",
+            )
+    else:
+        metadata = await run_db(get_data_metadata_by_id, dashboard.data_id)
+        if not snapshot_is_current(snapshot, dashboard, metadata):
+            # Serve the stale snapshot while the refresh runs
+            await schedule_snapshot_refresh(dashboard.id)
+
+    headers = cache_headers(snapshot["etag"])
+    if etag_matches(if_none_match, snapshot["etag"]):
+        return not_modified(headers)
+    if "payload" not in snapshot:
+        snapshot = await run_db(get_dashboard_snapshot, dashboard.id)
+    return JSONResponse(content=snapshot["payload"], headers=headers)
@@ -1,23 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from app.models.models import UserInDB
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    status,
+    UploadFile,
+    File,
+)
+from fastapi.responses import StreamingResponse
+from typing import Optional, Literal
+from bson import ObjectId
+import json
+import os
+from app.models.models import UserInDB, JobStatus, SourceType
 from app.core.dependencies import get_current_active_user
+from app.core.concurrency import run_db, run_cpu, iterate_db
+from app.core.http import (
+    attachment_disposition,
+    cache_headers,
+    etag_matches,
+    make_etag,
+    not_modified,
+)
+from app.core.workers import save_upload, submit_ingest_job
 from app.crud.data import (
     get_data_template_by_id,
     get_data_metadata_by_id,
-    process_excel_upload,
+    get_dataset_template_id,
+    claim_dataset_append,
+    release_dataset_append,
     analyze_data,
+    dataset_version,
+    version_token,
 )
+from app.crud.jobs import create_ingest_job, get_ingest_job
+from app.settings import settings
 
 router = APIRouter(prefix="/data", tags=["data"])
 
 
-@router.post("/upload/{template_id}", status_code=status.HTTP_201_CREATED)
+def parse_filters(filters: Optional[str]) -> Optional[dict]:
+    """Decode a filters query parameter, raising ValueError if it isn't a JSON object"""
+    filter_spec = json.loads(filters) if filters else None
+    if filter_spec is not None and not isinstance(filter_spec, dict):
+        raise ValueError("filters must be a JSON object")
+    return filter_spec
+
+
+def upload_source_type(filename: Optional[str]) -> SourceType:
+    if filename and filename.lower().endswith((".xlsx", ".xls")):
+        return SourceType.EXCEL
+    if filename and filename.lower().endswith(".csv"):
+        return SourceType.CSV
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Only Excel (.xlsx, .xls) and CSV (.csv) files are supported",
+    )
+
+
+@router.post("/upload/{template_id}", status_code=status.HTTP_202_ACCEPTED)
 async def upload_data(
     template_id: str,
     file: UploadFile = File(...),
     current_user: UserInDB = Depends(get_current_active_user),
 ):
-    template = get_data_template_by_id(template_id)
+    template = await run_db(get_data_template_by_id, template_id)
     if not template:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -30,50 +79,137 @@ async def upload_data(
             detail="Not authorized to use this template",
         )
 
-    if not file.filename.endswith((".xlsx", ".xls")):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only Excel files (.xlsx, .xls) are supported",
-        )
+    source_type = upload_source_type(file.filename)
 
     try:
-        content = await file.read()
-        metadata, docs_created = process_excel_upload(
-            file_content=content,
-            template=template,
+        file_path = await run_cpu(save_upload, file.file, file.filename)
+        job = await run_db(
+            create_ingest_job,
             user_id=current_user.id,
+            template_id=template.id,
             filename=file.filename,
+            file_path=file_path,
+            source_type=source_type,
+        )
+        submit_ingest_job(job.id, job.file_path)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error queuing file: {str(e)}",
         )
 
-        return {
-            "message": "Data uploaded successfully",
-            "data_id": metadata.id,
-            "rows_processed": docs_created,
-            "metadata": {
-                "name": metadata.name,
-                "columns": metadata.columns,
-                "num_rows": metadata.num_rows,
-                "source_type": metadata.source_type,
-            },
-        }
-    except ValueError as e:
+    return {
+        "message": "Upload accepted",
+        "job_id": job.id,
+        "status": job.status,
+    }
+
+
+@router.post("/{data_id}/append", status_code=status.HTTP_202_ACCEPTED)
+async def append_data(
+    data_id: str,
+    file: UploadFile = File(...),
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    """Queue an upload whose rows are added to an existing dataset"""
+    metadata = await run_db(get_data_metadata_by_id, data_id)
+    if not metadata:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Validation error: {str(e)}",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Data not found",
+        )
+
+    if metadata.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to modify this data",
+        )
+
+    source_type = upload_source_type(file.filename)
+    template_id = metadata.template_id or await run_db(get_dataset_template_id, data_id)
+
+    # Appends run one at a time per dataset; the claim is a single conditional
+    # update, so two concurrent requests can never both pass it
+    job_id = str(ObjectId())
+    if not await run_db(claim_dataset_append, data_id, job_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Another upload to this data is still being processed",
         )
+
+    job = None
+    try:
+        file_path = await run_cpu(save_upload, file.file, file.filename)
+        job = await run_db(
+            create_ingest_job,
+            user_id=current_user.id,
+            template_id=template_id,
+            filename=file.filename,
+            file_path=file_path,
+            source_type=source_type,
+            data_id=data_id,
+            append=True,
+            job_id=job_id,
+        )
+        submit_ingest_job(job.id, job.file_path)
     except Exception as e:
+        if job is None:
+            # A queued job keeps the claim; the sweeper resumes it
+            await run_db(release_dataset_append, data_id, job_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error processing file: {str(e)}",
+            detail=f"Error queuing file: {str(e)}",
         )
 
+    return {
+        "message": "Append accepted",
+        "job_id": job.id,
+        "status": job.status,
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def get_upload_job(
+    job_id: str,
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    job = await run_db(get_ingest_job, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+
+    if job.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this job",
+        )
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "filename": job.filename,
+        "data_id": job.data_id if job.status == JobStatus.SUCCEEDED else None,
+        "rows_processed": job.rows_processed,
+        "rows_per_second": job.rows_per_second,
+        "invalid_count": job.invalid_count,
+        "invalid_values": job.invalid_values,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
 
 @router.get("/{data_id}/analysis")
 async def get_data_analysis(
     data_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     current_user: UserInDB = Depends(get_current_active_user),
 ):
-    metadata = get_data_metadata_by_id(data_id)
+    metadata = await run_db(get_data_metadata_by_id, data_id)
     if not metadata:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -87,28 +223,28 @@ async def get_data_analysis(
         )
 
     try:
-        template = get_data_template_by_id(
-            next(
-                doc.template_id
-                for doc in [metadata]
-                if hasattr(metadata, "template_id")
-            )
-            if hasattr(metadata, "template_id")
-            else None
+        template_id = metadata.template_id or await run_db(
+            get_dataset_template_id, data_id
         )
-
-        from app.crud.data import get_data_documents_by_data_id
-
-        documents = get_data_documents_by_data_id(data_id)
-        if not documents:
+        if not template_id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="No data documents found",
             )
 
-        template_id = documents[0].template_id
-        analysis = analyze_data(data_id, template_id)
+        template = await run_db(get_data_template_by_id, template_id)
+        headers = cache_headers(
+            make_etag(
+                dataset_version(metadata),
+                version_token(template.updated_at) if template else None,
+            )
+        )
+        if etag_matches(if_none_match, headers["ETag"]):
+            return not_modified(headers)
+
+        analysis = await run_cpu(analyze_data, data_id, template_id)
 
+        response.headers.update(headers)
         return analysis
     except ValueError as e:
         raise HTTPException(
@@ -128,7 +264,7 @@ async def preview_data(
     limit: int = 50,
     current_user: UserInDB = Depends(get_current_active_user),
 ):
-    metadata = get_data_metadata_by_id(data_id)
+    metadata = await run_db(get_data_metadata_by_id, data_id)
     if not metadata:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -143,7 +279,7 @@ async def preview_data(
 
     from app.crud.data import get_data_documents_preview
 
-    preview_data = get_data_documents_preview(data_id, limit)
+    preview_data = await run_db(get_data_documents_preview, data_id, limit)
 
     return {
         "data_id": data_id,
@@ -155,21 +291,125 @@ async def preview_data(
     }
 
 
+@router.get("/{data_id}/rows")
+async def browse_data(
+    data_id: str,
+    limit: int = Query(settings.PAGE_DEFAULT_LIMIT, ge=1, le=settings.ROWS_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    columns: Optional[str] = None,
+    sort: Optional[str] = None,
+    order: Literal["asc", "desc"] = "asc",
+    filters: Optional[str] = None,
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    """Page through a dataset's rows with sorting, projection and filters"""
+    metadata = await run_db(get_data_metadata_by_id, data_id)
+    if not metadata:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Data not found",
+        )
+
+    if metadata.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this data",
+        )
+
+    from app.crud.data import browse_data_documents
+
+    try:
+        filter_spec = parse_filters(filters)
+        selected = columns.split(",") if columns else None
+        rows, next_cursor = await run_db(
+            browse_data_documents,
+            metadata,
+            limit,
+            cursor=cursor,
+            columns=selected,
+            sort=sort,
+            descending=order == "desc",
+            filters=filter_spec,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {
+        "data_id": data_id,
+        "columns": selected or metadata.columns,
+        "rows": rows,
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/{data_id}/export")
+async def export_data(
+    data_id: str,
+    format: Literal["csv", "xlsx", "parquet"] = "csv",
+    columns: Optional[str] = None,
+    filters: Optional[str] = None,
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    """Stream a whole dataset, optionally filtered, as a CSV, Excel or Parquet file"""
+    metadata = await run_db(get_data_metadata_by_id, data_id)
+    if not metadata:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Data not found",
+        )
+
+    if metadata.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this data",
+        )
+
+    from app.crud.export import export_dataset, EXPORT_MEDIA_TYPES
+
+    try:
+        content = export_dataset(
+            metadata,
+            format,
+            columns=columns.split(",") if columns else None,
+            filters=parse_filters(filters),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    filename = f"{os.path.splitext(metadata.name)[0].replace(' ', '_')}.{format}"
+    return StreamingResponse(
+        iterate_db(content),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": attachment_disposition(filename)},
+    )
+
+
 @router.get("/")
-async def list_data(current_user: UserInDB = Depends(get_current_active_user)):
+async def list_data(
+    response: Response,
+    limit: int = Query(settings.PAGE_DEFAULT_LIMIT, ge=1, le=settings.PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: UserInDB = Depends(get_current_active_user),
+):
     from app.crud.data import list_data_metadata_by_user
 
-    metadata_list = list_data_metadata_by_user(current_user.id)
+    try:
+        metadata_list, next_cursor = await run_db(
+            list_data_metadata_by_user, current_user.id, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
     return [
         {
-            "data_id": m.id,
-            "name": m.name,
-            "num_rows": m.num_rows,
-            "num_columns": len(m.columns),
-            "columns": m.columns,
-            "source_type": m.source_type,
-            "created_at": m.created_at.isoformat(),
+            "data_id": m["_id"],
+            "name": m["name"],
+            "num_rows": m["num_rows"],
+            "num_columns": m["num_columns"],
+            "source_type": m["source_type"],
+            "created_at": m["created_at"].isoformat(),
         }
         for m in metadata_list
     ]
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from app.models.models import UserInDB
+from app.core.dependencies import get_current_active_user
+from app.core.concurrency import hash_pool_stats
+from app.crud.dashboard import widget_cache
+from app.crud.data import workbook_cache
+from app.crud.user import user_cache
+from app.models.mongo import pool_monitor
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/")
+async def get_metrics(current_user: UserInDB = Depends(get_current_active_user)):
+    """In-process cache and pool counters for this worker"""
+    return {
+        "widget_cache": widget_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "workbook_cache": workbook_cache.stats(),
+        "password_hashing": hash_pool_stats(),
+        "mongo_pool": pool_monitor.stats(),
+    }
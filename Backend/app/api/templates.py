@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from pydantic import BaseModel, Field
 from app.models.models import UserInDB, DataTemplate
 from app.core.dependencies import get_current_active_user
+from app.core.concurrency import run_db, run_cpu
+from app.core.http import (
+    attachment_disposition,
+    cache_headers,
+    etag_matches,
+    make_etag,
+    not_modified,
+)
 from app.crud.data import (
     create_data_template,
     get_data_template_by_id,
     list_data_templates_by_user,
     update_data_template,
     delete_data_template,
-    generate_xlsx_from_template,
+    get_cached_workbook,
+    build_template_workbook,
+    version_token,
 )
+from app.settings import settings
 from typing import List, Optional
 
 router = APIRouter(prefix="/templates", tags=["templates"])
@@ -43,7 +53,8 @@ async def create_template(
     template_data: TemplateCreate,
     current_user: UserInDB = Depends(get_current_active_user),
 ):
-    template = create_data_template(
+    template = await run_db(
+        create_data_template,
         user_id=current_user.id,
         name=template_data.name,
         columns=template_data.columns,
@@ -59,16 +70,28 @@ async def create_template(
 
 
 @router.get("/", response_model=List[TemplateResponse])
-async def list_templates(current_user: UserInDB = Depends(get_current_active_user)):
-    templates = list_data_templates_by_user(current_user.id)
+async def list_templates(
+    response: Response,
+    limit: int = Query(settings.PAGE_DEFAULT_LIMIT, ge=1, le=settings.PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    try:
+        templates, next_cursor = await run_db(
+            list_data_templates_by_user, current_user.id, limit, cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return [
         TemplateResponse(
-            _id=t.id,
-            user_id=t.user_id,
-            name=t.name,
-            columns=t.columns,
-            created_at=t.created_at.isoformat(),
-            updated_at=t.updated_at.isoformat(),
+            _id=t["_id"],
+            user_id=t["user_id"],
+            name=t["name"],
+            columns=t["columns"],
+            created_at=t["created_at"].isoformat(),
+            updated_at=t["updated_at"].isoformat(),
         )
         for t in templates
     ]
@@ -79,7 +102,7 @@ async def get_template(
     template_id: str,
     current_user: UserInDB = Depends(get_current_active_user),
 ):
-    template = get_data_template_by_id(template_id)
+    template = await run_db(get_data_template_by_id, template_id)
     if not template:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -106,7 +129,7 @@ async def update_template(
     template_data: TemplateUpdate,
     current_user: UserInDB = Depends(get_current_active_user),
 ):
-    existing = get_data_template_by_id(template_id)
+    existing = await run_db(get_data_template_by_id, template_id)
     if not existing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -118,7 +141,8 @@ async def update_template(
             detail="Not authorized to modify this template",
         )
 
-    updated = update_data_template(
+    updated = await run_db(
+        update_data_template,
         template_id=template_id,
         name=template_data.name,
         columns=template_data.columns,
@@ -144,7 +168,7 @@ async def delete_template(
     template_id: str,
     current_user: UserInDB = Depends(get_current_active_user),
 ):
-    existing = get_data_template_by_id(template_id)
+    existing = await run_db(get_data_template_by_id, template_id)
     if not existing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -156,7 +180,7 @@ async def delete_template(
             detail="Not authorized to delete this template",
         )
 
-    deleted = delete_data_template(template_id)
+    deleted = await run_db(delete_data_template, template_id)
     if not deleted:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -167,9 +191,10 @@ async def delete_template(
 @router.get("/{template_id}/download")
 async def download_template_excel(
     template_id: str,
+    if_none_match: Optional[str] = Header(None),
     current_user: UserInDB = Depends(get_current_active_user),
 ):
-    template = get_data_template_by_id(template_id)
+    template = await run_db(get_data_template_by_id, template_id)
     if not template:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -181,11 +206,18 @@ async def download_template_excel(
             detail="Not authorized to access this template",
         )
 
-    excel_file = generate_xlsx_from_template(template)
+    headers = cache_headers(make_etag(version_token(template.updated_at)))
+    if etag_matches(if_none_match, headers["ETag"]):
+        return not_modified(headers)
+
+    # A template only changes with its updated_at, so its workbook is built once
+    content = get_cached_workbook(template)
+    if content is None:
+        content = await run_cpu(build_template_workbook, template)
     filename = f"{template.name.replace(' ', '_')}_template.xlsx"
 
-    return StreamingResponse(
-        excel_file,
+    return Response(
+        content=content,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        headers={**headers, "Content-Disposition": attachment_disposition(filename)},
     )
@@ -18,10 +18,20 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     password_bytes = password.encode("utf-8")[:72]
-    hashed = bcrypt.hashpw(password_bytes, bcrypt.gensalt())
+    hashed = bcrypt.hashpw(password_bytes, bcrypt.gensalt(settings.BCRYPT_ROUNDS))
     return hashed.decode("utf-8")
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a hash was made with a different cost than the configured one"""
+    # bcrypt hashes look like $2b$<cost>$<salt+hash>
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != settings.BCRYPT_ROUNDS
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
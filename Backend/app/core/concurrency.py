@@ -0,0 +1,125 @@
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, TypeVar
+from anyio import CapacityLimiter, to_thread
+from fastapi import HTTPException, status
+from app.settings import settings
+
+T = TypeVar("T")
+
+_db_limiter: Optional[CapacityLimiter] = None
+_cpu_limiter: Optional[CapacityLimiter] = None
+_hash_limiter: Optional[CapacityLimiter] = None
+
+# Only touched from the event loop thread, so plain counters are safe
+_hash_stats = {
+    "pending": 0,
+    "completed": 0,
+    "failed": 0,
+    "rejected": 0,
+    "total_seconds": 0.0,
+    "max_seconds": 0.0,
+}
+
+
+def get_db_limiter() -> CapacityLimiter:
+    # Limiters bind to the running event loop, so they are created lazily
+    global _db_limiter
+    if _db_limiter is None:
+        _db_limiter = CapacityLimiter(settings.DB_THREAD_POOL_SIZE)
+    return _db_limiter
+
+
+def get_cpu_limiter() -> CapacityLimiter:
+    global _cpu_limiter
+    if _cpu_limiter is None:
+        _cpu_limiter = CapacityLimiter(settings.CPU_THREAD_POOL_SIZE)
+    return _cpu_limiter
+
+
+def get_hash_limiter() -> CapacityLimiter:
+    global _hash_limiter
+    if _hash_limiter is None:
+        _hash_limiter = CapacityLimiter(settings.HASH_THREAD_POOL_SIZE)
+    return _hash_limiter
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking pymongo call in the bounded database thread pool"""
+    return await to_thread.run_sync(
+        partial(func, *args, **kwargs), limiter=get_db_limiter()
+    )
+
+
+async def run_cpu(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run pandas/openpyxl work in the bounded CPU thread pool"""
+    return await to_thread.run_sync(
+        partial(func, *args, **kwargs), limiter=get_cpu_limiter()
+    )
+
+
+async def iterate_db(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """Drain a blocking iterator in the database thread pool, one item per call"""
+    done = object()
+    try:
+        while True:
+            item = await run_db(next, iterator, done)
+            if item is done:
+                return
+            yield item
+    finally:
+        # Closing runs the iterator's cleanup, e.g. closing its Mongo cursor,
+        # when the client disconnects mid-stream
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await run_db(close)
+
+
+async def run_hash(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run bcrypt work in its own thread pool, rejecting calls once the queue is full"""
+    max_pending = settings.HASH_THREAD_POOL_SIZE + settings.HASH_QUEUE_LIMIT
+    if _hash_stats["pending"] >= max_pending:
+        _hash_stats["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many authentication requests, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    _hash_stats["pending"] += 1
+    started = time.perf_counter()
+    try:
+        result = await to_thread.run_sync(
+            partial(func, *args, **kwargs), limiter=get_hash_limiter()
+        )
+    except Exception:
+        # Failures stay out of the latency figures, which describe finished hashes
+        _hash_stats["failed"] += 1
+        raise
+    finally:
+        _hash_stats["pending"] -= 1
+
+    elapsed = time.perf_counter() - started
+    _hash_stats["completed"] += 1
+    _hash_stats["total_seconds"] += elapsed
+    _hash_stats["max_seconds"] = max(_hash_stats["max_seconds"], elapsed)
+    return result
+
+
+def hash_pool_stats() -> Dict[str, Any]:
+    """Queue depth and latency of password hashing, including time spent queued"""
+    completed = _hash_stats["completed"]
+    return {
+        "pool_size": settings.HASH_THREAD_POOL_SIZE,
+        "queue_limit": settings.HASH_QUEUE_LIMIT,
+        "pending": _hash_stats["pending"],
+        "completed": completed,
+        "failed": _hash_stats["failed"],
+        "rejected": _hash_stats["rejected"],
+        "avg_ms": (
+            round(_hash_stats["total_seconds"] / completed * 1000, 1)
+            if completed
+            else 0
+        ),
+        "max_ms": round(_hash_stats["max_seconds"] * 1000, 1),
+    }
@@ -1,17 +1,21 @@
 from fastapi import Depends, HTTPException, status
 from app.auth.security import oauth2_scheme, decode_access_token
-from app.crud.user import get_user_by_username
+from app.core.concurrency import run_db
+from app.crud.user import get_user_by_username, get_cached_user, cache_user
 from app.models.models import UserInDB
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
     token_data = decode_access_token(token)
-    user = get_user_by_username(token_data.username)
+    user = get_cached_user(token_data.username)
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-        )
+        user = await run_db(get_user_by_username, token_data.username)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+            )
+        cache_user(user)
     return user
 
 
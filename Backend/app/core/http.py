@@ -0,0 +1,43 @@
+import hashlib
+from typing import Dict, Optional
+from urllib.parse import quote
+from fastapi import Response, status
+
+# Responses depend on the caller's token, so only the browser may keep them,
+# and it must revalidate with If-None-Match before reusing one
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*versions: Optional[str]) -> str:
+    """Strong ETag derived from the versions a response was built from"""
+    raw = "|".join("" if version is None else version for version in versions)
+    return f'"{hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header names the ETag"""
+    if not if_none_match:
+        return False
+    # Weak comparison, as If-None-Match requires
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def cache_headers(etag: str, cache_control: str = PRIVATE_REVALIDATE) -> Dict[str, str]:
+    """Validator and caching headers of a conditional response"""
+    return {"ETag": etag, "Cache-Control": cache_control, "Vary": "Authorization"}
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """Empty 304 telling the client to reuse its copy"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+
+def attachment_disposition(filename: str) -> str:
+    """Content-Disposition of a download, safe for any characters in its name"""
+    # Quoted ASCII fallback for old clients, and the exact UTF-8 name (RFC 5987)
+    fallback = "".join(
+        char if " " <= char <= "~" and char not in '"\\' else "_" for char in filename
+    )
+    encoded = quote(filename, safe="")
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{encoded}"
@@ -0,0 +1,279 @@
+import asyncio
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Callable, Optional
+from bson import ObjectId
+from app.models.models import DataMetadata, IngestJob, JobStatus, SourceType
+from app.settings import settings
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_ingest_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Spawned workers start clean and open their own Mongo connections
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.INGEST_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_ingest_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def save_upload(file: BinaryIO, filename: str) -> str:
+    """Copy an upload to the spool directory so a worker can read it later"""
+    os.makedirs(settings.UPLOAD_SPOOL_DIR, exist_ok=True)
+    extension = os.path.splitext(filename)[1].lower()
+    file_path = os.path.join(settings.UPLOAD_SPOOL_DIR, f"{ObjectId()}{extension}")
+    with open(file_path, "wb") as output:
+        shutil.copyfileobj(file, output, length=1024 * 1024)
+    return file_path
+
+
+def submit_task(fn: Callable[..., Any], *args: Any) -> Future:
+    global _executor
+    try:
+        return get_ingest_executor().submit(fn, *args)
+    except BrokenProcessPool:
+        # A worker died abruptly; its pool refuses new work, so start another
+        _executor = None
+        return get_ingest_executor().submit(fn, *args)
+
+
+def job_is_committed(job: IngestJob, metadata: Optional[DataMetadata]) -> bool:
+    """Whether a job's rows are already part of its dataset"""
+    if job.append:
+        return metadata is not None and job.id in metadata.append_ids
+    return metadata is not None
+
+
+def discard_failed_job(job: IngestJob) -> None:
+    """Delete the uncommitted rows of a failed job and free its dataset"""
+    from app.crud.data import (
+        get_data_metadata_by_id,
+        delete_dataset_rows,
+        delete_appended_rows,
+        release_dataset_append,
+    )
+
+    if not job_is_committed(job, get_data_metadata_by_id(job.data_id)):
+        if job.append:
+            delete_appended_rows(job.data_id, job.id)
+        else:
+            delete_dataset_rows(job.data_id)
+    if job.append:
+        release_dataset_append(job.data_id, job.id)
+
+
+def ingest_job_done(job_id: str, file_path: str, future: Future) -> None:
+    """Fail a job whose task died outside run_ingest_job's own error handling"""
+    from app.crud.jobs import fail_ingest_job, get_ingest_job
+
+    # Cancelled at shutdown: the job stays queued and is resumed later
+    if future.cancelled() or future.exception() is None:
+        return
+    error = future.exception()
+    try:
+        if fail_ingest_job(job_id, f"Ingestion worker failed: {error}"):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            job = get_ingest_job(job_id)
+            if job:
+                discard_failed_job(job)
+    except Exception as e:
+        print(f"Warning: could not mark ingestion job {job_id} failed: {e}")
+
+
+def submit_ingest_job(job_id: str, file_path: str) -> None:
+    future = submit_task(run_ingest_job, job_id)
+    future.add_done_callback(lambda f: ingest_job_done(job_id, file_path, f))
+
+
+def submit_snapshot_refresh(dashboard_id: str) -> None:
+    submit_task(run_snapshot_refresh, dashboard_id)
+
+
+def resume_ingest_jobs() -> int:
+    """Resubmit jobs interrupted by a restart, failing those whose upload is gone"""
+    from app.crud.jobs import requeue_stale_ingest_jobs, fail_ingest_job
+
+    resumed = 0
+    for job in requeue_stale_ingest_jobs(settings.INGEST_JOB_STALE_SECONDS):
+        if os.path.exists(job.file_path):
+            submit_ingest_job(job.id, job.file_path)
+            resumed += 1
+        else:
+            if fail_ingest_job(
+                job.id, "Uploaded file was lost before processing finished"
+            ):
+                discard_failed_job(job)
+    return resumed
+
+
+async def sweep_ingest_jobs() -> None:
+    """Periodically resume jobs whose worker died while this process kept running"""
+    from app.core.concurrency import run_db
+
+    while True:
+        await asyncio.sleep(settings.INGEST_JOB_SWEEP_SECONDS)
+        try:
+            resumed = await run_db(resume_ingest_jobs)
+            if resumed:
+                print(f"Resumed {resumed} stalled ingestion jobs.")
+        except Exception as e:
+            print(f"Warning: sweeping ingestion jobs failed: {e}")
+
+
+def run_ingest_job(job_id: str) -> None:
+    """Parse and store an upload, recording progress on the job document"""
+    from app.crud.data import (
+        get_data_template_by_id,
+        get_data_metadata_by_id,
+        delete_dataset_rows,
+        delete_appended_rows,
+        release_dataset_append,
+        process_excel_upload,
+        process_excel_append,
+        process_csv_upload,
+        process_csv_append,
+    )
+    from app.crud.dashboard import refresh_materialized_dashboards
+    from app.crud.jobs import (
+        IngestJobSuperseded,
+        claim_ingest_job,
+        update_ingest_job,
+        fail_ingest_job,
+    )
+
+    job = claim_ingest_job(job_id)
+    if job is None:
+        return
+
+    # Every write is tied to this attempt: once the job is requeued and claimed
+    # again, this attempt's updates match nothing and it stops
+    attempt = job.attempts
+    started = time.perf_counter()
+
+    def update_attempt(**fields: Any) -> None:
+        if not update_ingest_job(job_id, attempt=attempt, **fields):
+            raise IngestJobSuperseded(
+                f"Attempt {attempt} of job {job_id} was superseded"
+            )
+
+    def on_progress(rows_processed: int) -> None:
+        elapsed = time.perf_counter() - started
+        update_attempt(
+            rows_processed=rows_processed,
+            rows_per_second=round(rows_processed / elapsed, 1) if elapsed else 0,
+        )
+
+    invalid = {"count": 0, "values": []}
+
+    def on_invalid(count: int, values: list) -> None:
+        invalid["count"] += count
+        room = settings.INGEST_INVALID_SAMPLE_LIMIT - len(invalid["values"])
+        invalid["values"].extend(values[:room])
+        update_attempt(invalid_count=invalid["count"], invalid_values=invalid["values"])
+
+    def finish() -> None:
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
+        if job.append:
+            release_dataset_append(job.data_id, job.id)
+        refresh_materialized_dashboards(job.data_id)
+
+    try:
+        template = get_data_template_by_id(job.template_id)
+        if template is None:
+            raise ValueError("Template not found")
+
+        metadata = get_data_metadata_by_id(job.data_id)
+        if job.append and metadata is None:
+            raise ValueError("Data not found")
+        if job_is_committed(job, metadata):
+            # A previous attempt stored the rows but died before finishing the job
+            update_attempt(
+                status=JobStatus.SUCCEEDED, finished_at=datetime.now(timezone.utc)
+            )
+            finish()
+            return
+        if job.attempts > 1:
+            # A previous attempt died midway; drop only the rows it added
+            if job.append:
+                delete_appended_rows(job.data_id, job.id)
+            else:
+                delete_dataset_rows(job.data_id)
+
+        if job.source_type == SourceType.CSV:
+            process_upload, process_append = process_csv_upload, process_csv_append
+        elif job.source_type == SourceType.EXCEL:
+            process_upload, process_append = process_excel_upload, process_excel_append
+        else:
+            raise ValueError(f"Unsupported source type: {job.source_type}")
+
+        with open(job.file_path, "rb") as file:
+            if job.append:
+                metadata, docs_created = process_append(
+                    file=file,
+                    template=template,
+                    metadata=metadata,
+                    filename=job.filename,
+                    ingest_id=job.id,
+                    on_progress=on_progress,
+                    on_invalid=on_invalid,
+                )
+            else:
+                metadata, docs_created = process_upload(
+                    file=file,
+                    template=template,
+                    user_id=job.user_id,
+                    filename=job.filename,
+                    data_id=job.data_id,
+                    on_progress=on_progress,
+                    on_invalid=on_invalid,
+                )
+
+        elapsed = time.perf_counter() - started
+        finished = update_ingest_job(
+            job_id,
+            attempt=attempt,
+            status=JobStatus.SUCCEEDED,
+            data_id=metadata.id,
+            rows_processed=docs_created,
+            rows_per_second=round(docs_created / elapsed, 1) if elapsed else 0,
+            finished_at=datetime.now(timezone.utc),
+        )
+    except IngestJobSuperseded:
+        # The newer attempt owns the job, its upload file and its rows now
+        return
+    except Exception as e:
+        if fail_ingest_job(job_id, str(e), attempt=attempt):
+            # Only the attempt that still owns the job may delete what it wrote
+            discard_failed_job(job)
+            if os.path.exists(job.file_path):
+                os.remove(job.file_path)
+        return
+    if finished:
+        finish()
+
+
+def run_snapshot_refresh(dashboard_id: str) -> None:
+    """Recompute a materialized dashboard whose refresh was claimed by the caller"""
+    from app.crud.dashboard import refresh_dashboard_snapshot
+
+    try:
+        refresh_dashboard_snapshot(dashboard_id)
+    except Exception as e:
+        print(f"Warning: refreshing dashboard {dashboard_id} failed: {e}")
@@ -0,0 +1,129 @@
+from typing import Optional, List, Iterator, Callable
+from app.models.mongo import get_database
+from app.settings import settings
+import numpy as np
+import pandas as pd
+
+# Type byte, array index key and length prefix of each value in a block
+VALUE_OVERHEAD_BYTES = 16
+FIXED_VALUE_BYTES = 8
+
+
+def value_sizes(series: pd.Series) -> np.ndarray:
+    """Approximate encoded size of each value of a column inside a block"""
+    if series.dtype != object:
+        return np.full(len(series), FIXED_VALUE_BYTES + VALUE_OVERHEAD_BYTES)
+    sizes = series.map(
+        lambda v: len(v.encode("utf-8")) if isinstance(v, str) else FIXED_VALUE_BYTES
+    )
+    return sizes.to_numpy(dtype=np.int64) + VALUE_OVERHEAD_BYTES
+
+
+def chunk_bounds(df: pd.DataFrame) -> Iterator[tuple[int, int]]:
+    """Row ranges of the blocks a DataFrame is stored in"""
+    # Blocks hold at most DATASET_CHUNK_ROWS rows and, in every column, at
+    # most DATASET_CHUNK_MAX_BYTES, so wide text stays under the BSON limit.
+    # All columns share the same bounds, keeping chunk numbers aligned
+    chunk_rows = settings.DATASET_CHUNK_ROWS
+    max_bytes = settings.DATASET_CHUNK_MAX_BYTES
+    totals = [np.cumsum(value_sizes(df[col])) for col in df.columns]
+    start = 0
+    while start < len(df):
+        end = min(start + chunk_rows, len(df))
+        for total in totals:
+            base = total[start - 1] if start else 0
+            fits = int(np.searchsorted(total, base + max_bytes, side="right"))
+            end = min(end, max(fits, start + 1))
+        yield start, end
+        start = end
+
+
+def write_column_chunks(
+    data_id: str,
+    df: pd.DataFrame,
+    reserve_chunks: Callable[[int], int],
+    ingest_id: Optional[str] = None,
+) -> int:
+    """Store a DataFrame as per-column value blocks of up to DATASET_CHUNK_ROWS rows"""
+    db = get_database()
+    data_columns = db.data_columns
+
+    bounds = list(chunk_bounds(df))
+    if not bounds:
+        return 0
+    # Chunk numbers are reserved up front, so concurrent writers never share one
+    chunk = reserve_chunks(len(bounds))
+    for start, end in bounds:
+        part = df.iloc[start:end]
+        blocks = [
+            {
+                "data_id": data_id,
+                "column": str(col),
+                "chunk": chunk,
+                "num_rows": len(part),
+                # NaN, NaT and pd.NA are stored as real nulls
+                "values": part[col]
+                .astype(object)
+                .where(part[col].notna(), None)
+                .tolist(),
+                **({"ingest_id": ingest_id} if ingest_id else {}),
+            }
+            for col in part.columns
+        ]
+        if blocks:
+            data_columns.insert_many(blocks)
+        chunk += 1
+    return len(bounds)
+
+
+def read_column_frame(
+    data_id: str, columns: Optional[List[str]] = None
+) -> Optional[pd.DataFrame]:
+    """Rebuild a DataFrame from column blocks, or None if the dataset has no blocks"""
+    db = get_database()
+    data_columns = db.data_columns
+
+    query = {"data_id": data_id}
+    if columns is not None:
+        query["column"] = {"$in": columns}
+
+    values = {}
+    for block in data_columns.find(query, {"_id": 0, "column": 1, "values": 1}).sort(
+        [("column", 1), ("chunk", 1)]
+    ):
+        values.setdefault(block["column"], []).extend(block["values"])
+
+    if not values:
+        # Datasets uploaded before the column store only have row documents
+        if data_columns.find_one({"data_id": data_id}, {"_id": 1}) is None:
+            return None
+        return pd.DataFrame()
+
+    ordered = [col for col in (columns or list(values)) if col in values]
+    return pd.DataFrame({col: values[col] for col in ordered})
+
+
+def next_column_chunk(data_id: str, column: str) -> int:
+    """Chunk number after the last stored block of a dataset"""
+    db = get_database()
+    data_columns = db.data_columns
+
+    # Every column has the same chunks, so one column's last block is enough
+    last = data_columns.find_one(
+        {"data_id": data_id, "column": column},
+        {"_id": 0, "chunk": 1},
+        sort=[("chunk", -1)],
+    )
+    return last["chunk"] + 1 if last else 0
+
+
+def delete_column_chunks(data_id: str, ingest_id: Optional[str] = None) -> int:
+    """Delete every column block of a dataset, or only those one append job wrote"""
+    db = get_database()
+    data_columns = db.data_columns
+
+    query = {"data_id": data_id}
+    if ingest_id:
+        query["ingest_id"] = ingest_id
+    result = data_columns.delete_many(query)
+    return result.deleted_count
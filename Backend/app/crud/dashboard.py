@@ -1,10 +1,62 @@
-from typing import Optional, List, Dict, Any
-from app.models.models import DashboardConfig, VisualizationWidget, AggregationType
+from typing import Optional, List, Dict, Any, Callable, Union
+from app.models.models import (
+    DashboardConfig,
+    DataMetadata,
+    VisualizationWidget,
+    AggregationType,
+    ChartType,
+)
 from app.models.mongo import get_database
-from datetime import datetime, timezone
+from app.crud.filters import filter_mask, has_relative_window
+from app.crud.pagination import find_page
+from app.crud.pipeline import (
+    aggregate_widget_data,
+    aggregate_partials,
+    is_mergeable_widget,
+    merge_partials,
+    render_partials,
+    OTHER_LABEL,
+)
+from app.crud.timeseries import bucket_dates, downsample_payload
+from app.core.cache import LRUCache
+from app.core.http import make_etag
+from app.settings import settings
+from datetime import datetime, timedelta, timezone
 from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pymongo.errors import DuplicateKeyError
+import hashlib
+import json
 import pandas as pd
 
+# The list view only shows widget counts and titles, not widget specs
+DASHBOARD_LIST_FIELDS = [
+    "user_id",
+    "template_id",
+    "data_id",
+    "name",
+    "layout_type",
+    "materialized",
+    "widgets.position",
+    "widgets.chart_type",
+    "widgets.title",
+    "created_at",
+    "updated_at",
+]
+
+
+def _payload_size(payload: Any) -> int:
+    return len(json.dumps(payload, default=str))
+
+
+# Computed widget payloads keyed by (data_id, dataset version, widget spec hash)
+widget_cache = LRUCache(
+    max_entries=settings.WIDGET_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.WIDGET_CACHE_TTL_SECONDS,
+    max_bytes=settings.WIDGET_CACHE_MAX_BYTES,
+    sizeof=_payload_size,
+)
+
 
 def create_dashboard(
     user_id: str,
@@ -13,6 +65,7 @@ def create_dashboard(
     name: str,
     widgets: List[Dict[str, Any]],
     layout_type: str = "default_6",
+    materialized: bool = False,
 ) -> DashboardConfig:
     """Create a new dashboard configuration"""
     db = get_database()
@@ -26,6 +79,7 @@ def create_dashboard(
         "name": name,
         "layout_type": layout_type,
         "widgets": widgets,
+        "materialized": materialized,
         "created_at": now,
         "updated_at": now,
     }
@@ -46,23 +100,27 @@ def get_dashboard_by_id(dashboard_id: str) -> Optional[DashboardConfig]:
     return None
 
 
-def list_dashboards_by_user(user_id: str) -> List[DashboardConfig]:
-    """List all dashboards for a user"""
+def list_dashboards_by_user(
+    user_id: str, limit: int, cursor: Optional[str] = None
+) -> tuple[List[Dict[str, Any]], Optional[str]]:
+    """List one page of a user's dashboards and the next page cursor"""
     db = get_database()
     dashboards = db.dashboards
 
-    docs = dashboards.find({"user_id": user_id})
-    dashboard_list = []
-    for doc in docs:
-        doc["_id"] = str(doc["_id"])
-        dashboard_list.append(DashboardConfig(**doc))
-    return dashboard_list
+    return find_page(
+        dashboards,
+        {"user_id": user_id},
+        DASHBOARD_LIST_FIELDS,
+        limit,
+        cursor,
+    )
 
 
 def update_dashboard(
     dashboard_id: str,
     name: Optional[str] = None,
     widgets: Optional[List[Dict[str, Any]]] = None,
+    materialized: Optional[bool] = None,
 ) -> Optional[DashboardConfig]:
     """Update dashboard configuration"""
     db = get_database()
@@ -73,6 +131,8 @@ def update_dashboard(
         update_fields["name"] = name
     if widgets is not None:
         update_fields["widgets"] = widgets
+    if materialized is not None:
+        update_fields["materialized"] = materialized
     if not update_fields:
         return None
 
@@ -82,7 +142,12 @@ def update_dashboard(
         {"$set": update_fields},
     )
     if result.modified_count == 1:
-        return get_dashboard_by_id(dashboard_id)
+        dashboard = get_dashboard_by_id(dashboard_id)
+        if dashboard:
+            invalidate_widget_cache(dashboard.data_id)
+            if not dashboard.materialized:
+                delete_dashboard_snapshot(dashboard_id)
+        return dashboard
     return None
 
 
@@ -92,29 +157,111 @@ def delete_dashboard(dashboard_id: str) -> bool:
     dashboards = db.dashboards
 
     result = dashboards.delete_one({"_id": ObjectId(dashboard_id)})
+    delete_dashboard_snapshot(dashboard_id)
     return result.deleted_count == 1
 
 
+def widget_cache_key(
+    data_id: str, version: str, widget_dict: Dict[str, Any]
+) -> tuple[str, str, str]:
+    # Position and title don't change the computed payload
+    spec = {k: v for k, v in widget_dict.items() if k not in ("position", "title")}
+    digest = hashlib.sha256(
+        json.dumps(spec, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    return data_id, version, digest
+
+
+def invalidate_widget_cache(data_id: str) -> int:
+    """Drop cached widget payloads computed from a dataset"""
+    return widget_cache.invalidate(lambda key: key[0] == data_id)
+
+
+def widget_max_points(widget_dict: Dict[str, Any]) -> Optional[int]:
+    """Point cap of a widget's series; line and area charts are always capped"""
+    if widget_dict.get("max_points"):
+        return widget_dict["max_points"]
+    if widget_dict.get("chart_type") in (ChartType.LINE, ChartType.AREA):
+        return settings.WIDGET_MAX_POINTS
+    return None
+
+
+def get_widget_columns(
+    columns: List[str], filters: Optional[Dict[str, Any]] = None
+) -> List[str]:
+    """Columns a widget reads, including the ones it filters on"""
+    referenced = list(columns)
+    for col in filters or {}:
+        if col not in referenced:
+            referenced.append(col)
+    return referenced
+
+
+def top_n_with_other(
+    result: pd.Series, top_n: int, other: Callable[[pd.Index], Any]
+) -> pd.Series:
+    """Keep the top_n largest groups and fold the rest into an Other entry"""
+    # Select first, keeping every group tied at the cut, then order only the
+    # survivors; ties go to the smaller label, like the pipeline's sort on _id
+    top = result.nlargest(top_n, keep="all")
+    try:
+        top = top.sort_index(kind="stable")
+    except TypeError:
+        pass
+    top = top.sort_values(ascending=False, kind="stable").head(top_n)
+    if len(result) > top_n:
+        top = pd.concat([top, pd.Series([other(top.index)], index=[OTHER_LABEL])])
+    return top
+
+
+def other_flags(length: int) -> List[bool]:
+    """is_other of a payload whose last entry is the folded Other group"""
+    return [False] * (length - 1) + [True]
+
+
+def json_values(values: Union[pd.DataFrame, pd.Series]) -> Any:
+    """Replace NaN, NaT and pd.NA with None so the payload is valid JSON"""
+    return values.astype(object).where(values.notna(), None)
+
+
 def process_widget_data(
     data_id: str,
     columns: List[str],
     aggregation: Optional[str] = None,
     filters: Optional[Dict[str, Any]] = None,
+    df: Optional[pd.DataFrame] = None,
+    metadata: Optional[DataMetadata] = None,
+    granularity: Optional[str] = None,
+    top_n: Optional[int] = None,
 ) -> Dict[str, Any]:
-    """Process data for a specific widget"""
-    from app.crud.data import get_data_documents_by_data_id
+    """Process data for a specific widget, reusing a preloaded dataset frame if given"""
+    if df is None:
+        from app.crud.data import get_data_metadata_by_id, load_dataset_frame
+
+        if settings.WIDGET_PUSHDOWN:
+            metadata = metadata or get_data_metadata_by_id(data_id)
+            if metadata:
+                result = aggregate_widget_data(
+                    metadata, columns, aggregation, filters, granularity, top_n
+                )
+                if result is not None:
+                    return result
+
+        df = load_dataset_frame(
+            data_id, get_widget_columns(columns, filters), filters, metadata
+        )
 
-    documents = get_data_documents_by_data_id(data_id)
-    if not documents:
+    if df.empty:
         return {"data": [], "labels": []}
 
-    rows = [doc.row_data for doc in documents]
-    df = pd.DataFrame(rows)
-
     if filters:
-        for col, value in filters.items():
-            if col in df.columns:
-                df = df[df[col] == value]
+        df = df[filter_mask(df, filters)]
+
+    if granularity and aggregation and len(columns) in (2, 3):
+        x_col = columns[0]
+        if x_col in df.columns:
+            # Rows whose date can't be parsed fall out of the groupby as NaT
+            df = df.assign(**{x_col: bucket_dates(df[x_col], granularity)})
 
     if aggregation is None and len(columns) >= 1:
         selected_cols = [col for col in columns if col in df.columns]
@@ -125,7 +272,7 @@ def process_widget_data(
 
         return {
             "columns": selected_cols,
-            "rows": table_data.values.tolist(),
+            "rows": json_values(table_data).values.tolist(),
         }
 
     if len(columns) == 1:
@@ -136,10 +283,20 @@ def process_widget_data(
         if aggregation == AggregationType.COUNT:
             if df[col].dtype == "object" or str(df[col].dtype) == "category":
                 value_counts = df[col].value_counts()
-                return {
+                folded = bool(top_n) and len(value_counts) > top_n
+                if top_n:
+                    value_counts = top_n_with_other(
+                        value_counts,
+                        top_n,
+                        lambda kept: int(value_counts.drop(kept).sum()),
+                    )
+                payload = {
                     "labels": value_counts.index.tolist(),
                     "data": value_counts.values.tolist(),
                 }
+                if folded:
+                    payload["is_other"] = other_flags(len(value_counts))
+                return payload
             else:
                 result = len(df)
                 return {"value": result, "label": col}
@@ -179,14 +336,34 @@ def process_widget_data(
                 else:
                     result = grouped.sum()
 
-                return {
+                folded = bool(top_n) and len(result) > top_n
+                if top_n:
+                    groups = result
+
+                    def other(kept: pd.Index) -> Any:
+                        if aggregation == AggregationType.AVG:
+                            return df.loc[~df[x_col].isin(kept), y_col].mean()
+                        if aggregation == AggregationType.MIN:
+                            return groups.drop(kept).min()
+                        if aggregation == AggregationType.MAX:
+                            return groups.drop(kept).max()
+                        return groups.drop(kept).sum()
+
+                    result = top_n_with_other(result, top_n, other)
+
+                payload = {
                     "labels": result.index.tolist(),
-                    "data": [round(float(v), 2) for v in result.values],
+                    "data": [
+                        round(float(v), 2) if pd.notna(v) else 0 for v in result.values
+                    ],
                 }
+                if folded:
+                    payload["is_other"] = other_flags(len(result))
+                return payload
             else:
                 return {
-                    "labels": df[x_col].tolist(),
-                    "data": df[y_col].tolist(),
+                    "labels": json_values(df[x_col]).tolist(),
+                    "data": json_values(df[y_col]).tolist(),
                 }
 
     elif len(columns) == 3:
@@ -225,28 +402,99 @@ def process_widget_data(
     return {"data": [], "labels": []}
 
 
-def get_dashboard_data(dashboard_id: str) -> Dict[str, Any]:
-    """Get processed data for all widgets in a dashboard"""
+def get_dashboard_data(
+    dashboard_id: str, precomputed: Optional[Dict[int, Any]] = None
+) -> Dict[str, Any]:
+    """Get processed data for all widgets in a dashboard, reusing precomputed payloads"""
     dashboard = get_dashboard_by_id(dashboard_id)
     if not dashboard:
         raise ValueError("Dashboard not found")
 
-    widgets_data = []
-    for widget in dashboard.widgets:
-        widget_dict = widget.dict() if hasattr(widget, "dict") else widget
-        processed_data = process_widget_data(
-            data_id=dashboard.data_id,
-            columns=widget_dict["columns"],
-            aggregation=widget_dict.get("aggregation"),
-            filters=widget_dict.get("filters"),
+    from app.crud.data import (
+        get_data_metadata_by_id,
+        load_dataset_frame,
+        dataset_version,
+    )
+
+    widget_dicts = [
+        widget.dict() if hasattr(widget, "dict") else widget
+        for widget in dashboard.widgets
+    ]
+
+    metadata = get_data_metadata_by_id(dashboard.data_id)
+    cache_keys = {}
+    processed = dict(precomputed or {})
+    if metadata:
+        version = dataset_version(metadata)
+        for idx, widget_dict in enumerate(widget_dicts):
+            # A relative window covers different rows on every read
+            if idx in processed or has_relative_window(widget_dict.get("filters")):
+                continue
+            cache_keys[idx] = widget_cache_key(dashboard.data_id, version, widget_dict)
+            cached = widget_cache.get(cache_keys[idx])
+            if cached is not None:
+                processed[idx] = cached
+    cached_idx = set(processed)
+
+    # Widgets the aggregation pipeline can answer never touch the raw rows
+    for idx, widget_dict in enumerate(widget_dicts):
+        if idx in processed:
+            continue
+        if metadata and settings.WIDGET_PUSHDOWN:
+            result = aggregate_widget_data(
+                metadata,
+                widget_dict["columns"],
+                widget_dict.get("aggregation"),
+                widget_dict.get("filters"),
+                widget_dict.get("granularity"),
+                widget_dict.get("top_n"),
+            )
+            if result is not None:
+                processed[idx] = result
+
+    # The rest read from one shared frame, so the dataset is scanned once
+    # and only for the union of the columns those widgets reference
+    pending = [idx for idx in range(len(widget_dicts)) if idx not in processed]
+    if pending:
+        referenced_columns = []
+        for idx in pending:
+            for col in get_widget_columns(
+                widget_dicts[idx]["columns"], widget_dicts[idx].get("filters")
+            ):
+                if col not in referenced_columns:
+                    referenced_columns.append(col)
+        df = load_dataset_frame(
+            dashboard.data_id, referenced_columns, metadata=metadata
         )
 
+        for idx in pending:
+            processed[idx] = process_widget_data(
+                data_id=dashboard.data_id,
+                columns=widget_dicts[idx]["columns"],
+                aggregation=widget_dicts[idx].get("aggregation"),
+                filters=widget_dicts[idx].get("filters"),
+                df=df,
+                granularity=widget_dicts[idx].get("granularity"),
+                top_n=widget_dicts[idx].get("top_n"),
+            )
+
+    for idx, widget_dict in enumerate(widget_dicts):
+        if idx not in cached_idx:
+            processed[idx] = downsample_payload(
+                processed[idx], widget_max_points(widget_dict)
+            )
+
+    for idx, key in cache_keys.items():
+        widget_cache.set(key, processed[idx])
+
+    widgets_data = []
+    for idx, widget_dict in enumerate(widget_dicts):
         widgets_data.append(
             {
                 "position": widget_dict["position"],
                 "chart_type": widget_dict["chart_type"],
                 "title": widget_dict["title"],
-                "data": processed_data,
+                "data": processed[idx],
             }
         )
 
@@ -256,3 +504,204 @@ def get_dashboard_data(dashboard_id: str) -> Dict[str, Any]:
         "layout_type": dashboard.layout_type,
         "widgets": widgets_data,
     }
+
+
+def dashboard_version(dashboard: DashboardConfig) -> str:
+    """Token that changes whenever a dashboard's configuration changes"""
+    from app.crud.data import version_token
+
+    return version_token(dashboard.updated_at)
+
+
+def get_dashboard_snapshot(
+    dashboard_id: str, with_payload: bool = True
+) -> Optional[Dict[str, Any]]:
+    """Stored payload of a materialized dashboard, if one was computed"""
+    db = get_database()
+    snapshot = db.dashboard_snapshots.find_one(
+        {"_id": ObjectId(dashboard_id)}, None if with_payload else {"payload": 0}
+    )
+    # A refresh claim alone creates the document before there is a payload
+    if snapshot and "etag" in snapshot:
+        return snapshot
+    return None
+
+
+def snapshot_is_current(
+    snapshot: Dict[str, Any],
+    dashboard: DashboardConfig,
+    metadata: Optional[DataMetadata],
+) -> bool:
+    """Whether a snapshot was computed from the current dashboard and dataset"""
+    from app.crud.data import dataset_version
+
+    data_version = dataset_version(metadata) if metadata else None
+    return (
+        snapshot.get("dashboard_version") == dashboard_version(dashboard)
+        and snapshot.get("data_version") == data_version
+    )
+
+
+def snapshot_partials(
+    dashboard: DashboardConfig,
+    metadata: Optional[DataMetadata],
+    previous: Optional[Dict[str, Any]],
+) -> Dict[int, List[Dict[str, Any]]]:
+    """Partials of a dashboard's mergeable widgets, extending the previous snapshot's"""
+    if metadata is None or not settings.WIDGET_PUSHDOWN:
+        return {}
+
+    stored, new_ids = {}, None
+    if previous and previous.get("dashboard_version") == dashboard_version(dashboard):
+        covered = previous.get("append_ids")
+        if covered is not None and metadata.append_ids[: len(covered)] == covered:
+            stored = previous.get("partials", {})
+            new_ids = metadata.append_ids[len(covered) :]
+
+    # Rows of appends still running, or of failed attempts, are left out so
+    # every committed append is counted exactly once
+    committed = {
+        "$or": [
+            {"ingest_id": {"$exists": False}},
+            {"ingest_id": {"$in": metadata.append_ids}},
+        ]
+    }
+    partials = {}
+    for idx, widget in enumerate(dashboard.widgets):
+        # Downsampled series depend on every point, so they are recomputed
+        if widget_max_points(widget.dict()) is not None or not is_mergeable_widget(
+            metadata, widget.columns, widget.aggregation, widget.top_n
+        ):
+            continue
+        if str(idx) in stored:
+            added = []
+            if new_ids:
+                added = aggregate_partials(
+                    metadata,
+                    widget.columns,
+                    widget.filters,
+                    widget.granularity,
+                    {"ingest_id": {"$in": new_ids}},
+                )
+            merged = (
+                merge_partials(stored[str(idx)], added) if added is not None else None
+            )
+        else:
+            merged = aggregate_partials(
+                metadata, widget.columns, widget.filters, widget.granularity, committed
+            )
+            merged = merge_partials(merged, []) if merged is not None else None
+        if merged is not None:
+            partials[idx] = merged
+    return partials
+
+
+def claim_snapshot_refresh(dashboard_id: str) -> bool:
+    """Mark a snapshot as refreshing, False if another refresh is in flight"""
+    db = get_database()
+    now = datetime.now(timezone.utc)
+    expired = now - timedelta(seconds=settings.SNAPSHOT_REFRESH_TIMEOUT_SECONDS)
+    try:
+        result = db.dashboard_snapshots.update_one(
+            {
+                "_id": ObjectId(dashboard_id),
+                "$or": [
+                    {"refresh_started_at": None},
+                    {"refresh_started_at": {"$lt": expired}},
+                ],
+            },
+            {"$set": {"refresh_started_at": now}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # The snapshot exists and its refresh claim has not expired
+        return False
+    return result.modified_count == 1 or result.upserted_id is not None
+
+
+def refresh_dashboard_snapshot(dashboard_id: str) -> Optional[Dict[str, Any]]:
+    """Recompute and store the payload of a materialized dashboard"""
+    # Sum, count, min, max and avg widgets merge the partials of appended rows
+    # into the stored ones; only the other widgets are recomputed in full
+    from app.crud.data import get_data_metadata_by_id, dataset_version
+
+    db = get_database()
+    snapshots = db.dashboard_snapshots
+
+    dashboard = get_dashboard_by_id(dashboard_id)
+    # Relative windows are read live, so such dashboards keep no snapshot
+    if (
+        dashboard is None
+        or not dashboard.materialized
+        or any(has_relative_window(w.filters) for w in dashboard.widgets)
+    ):
+        delete_dashboard_snapshot(dashboard_id)
+        return None
+
+    # Versions are read before computing, so a change landing mid-refresh
+    # leaves the snapshot stale instead of hiding the change
+    metadata = get_data_metadata_by_id(dashboard.data_id)
+    versions = {
+        "dashboard_version": dashboard_version(dashboard),
+        "data_version": dataset_version(metadata) if metadata else None,
+    }
+    try:
+        previous = snapshots.find_one(
+            {"_id": ObjectId(dashboard_id)},
+            {"dashboard_version": 1, "append_ids": 1, "partials": 1},
+        )
+        partials = snapshot_partials(dashboard, metadata, previous)
+        precomputed = {
+            idx: render_partials(
+                dashboard.widgets[idx].columns,
+                dashboard.widgets[idx].aggregation,
+                docs,
+            )
+            for idx, docs in partials.items()
+        }
+        payload = jsonable_encoder(get_dashboard_data(dashboard_id, precomputed))
+    except Exception:
+        snapshots.update_one(
+            {"_id": ObjectId(dashboard_id)}, {"$unset": {"refresh_started_at": ""}}
+        )
+        raise
+
+    snapshot = {
+        "payload": payload,
+        "etag": make_etag(versions["dashboard_version"], versions["data_version"]),
+        **versions,
+        "append_ids": metadata.append_ids if metadata else [],
+        "partials": {str(idx): docs for idx, docs in partials.items()},
+        "computed_at": datetime.now(timezone.utc),
+    }
+    snapshots.update_one(
+        {"_id": ObjectId(dashboard_id)},
+        {"$set": snapshot, "$unset": {"refresh_started_at": ""}},
+        upsert=True,
+    )
+    return snapshot
+
+
+def refresh_materialized_dashboards(data_id: str) -> int:
+    """Refresh the snapshots of materialized dashboards built on a dataset"""
+    db = get_database()
+    dashboards = db.dashboards
+
+    refreshed = 0
+    for doc in dashboards.find({"data_id": data_id, "materialized": True}, ["_id"]):
+        dashboard_id = str(doc["_id"])
+        if not claim_snapshot_refresh(dashboard_id):
+            continue
+        try:
+            refresh_dashboard_snapshot(dashboard_id)
+            refreshed += 1
+        except Exception as e:
+            # Reads keep the stale snapshot and retry the refresh
+            print(f"Warning: refreshing dashboard {dashboard_id} failed: {e}")
+    return refreshed
+
+
+def delete_dashboard_snapshot(dashboard_id: str) -> None:
+    """Drop the stored payload of a dashboard"""
+    db = get_database()
+    db.dashboard_snapshots.delete_one({"_id": ObjectId(dashboard_id)})
@@ -1,8 +1,8 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, BinaryIO, Callable, Iterable, Union
 from io import BytesIO
+from functools import partial
 from app.models.models import (
     DataMetadata,
-    DataDocument,
     DataTemplate,
     SourceType,
     ColumnType,
@@ -10,11 +10,56 @@ from app.models.models import (
     AggregationType,
 )
 from app.models.mongo import get_database
+from app.crud.column_store import (
+    write_column_chunks,
+    read_column_frame,
+    delete_column_chunks,
+    next_column_chunk,
+)
+from app.crud.ingest import (
+    merge_dtypes,
+    merge_dtype_maps,
+    iter_excel_batches,
+    iter_csv_batches,
+    coerce_batch,
+    to_records,
+    iter_frame_batches,
+)
+from app.crud.filters import compile_filters
+from app.crud.pipeline import is_pushdown_column
+from app.crud.pagination import find_page, encode_row_cursor, decode_row_cursor
+from app.crud.profile import (
+    build_profile,
+    merge_profiles,
+    finalize_profile,
+    PROFILE_FORMAT,
+)
+from app.core.cache import LRUCache
+from app.settings import settings
 from datetime import datetime, timezone
 from bson import ObjectId
 import pandas as pd
 from openpyxl.comments import Comment
 
+# Fields the list endpoints display; dtypes and other details stay behind
+TEMPLATE_LIST_FIELDS = ["user_id", "name", "columns", "created_at", "updated_at"]
+DATA_LIST_FIELDS = {
+    "name": 1,
+    "num_rows": 1,
+    # Counted on the server, so the column names never leave the database
+    "num_columns": {"$size": "$columns"},
+    "source_type": 1,
+    "created_at": 1,
+}
+
+# Generated template workbooks keyed by (template_id, template version)
+workbook_cache = LRUCache(
+    max_entries=settings.WORKBOOK_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.WORKBOOK_CACHE_TTL_SECONDS,
+    max_bytes=settings.WORKBOOK_CACHE_MAX_BYTES,
+    sizeof=len,
+)
+
 
 # Template CRUD operations
 def create_data_template(
@@ -51,17 +96,20 @@ def get_data_template_by_id(template_id: str) -> Optional[DataTemplate]:
     return None
 
 
-def list_data_templates_by_user(user_id: str) -> List[DataTemplate]:
-    """List all data templates for a given user"""
+def list_data_templates_by_user(
+    user_id: str, limit: int, cursor: Optional[str] = None
+) -> tuple[List[Dict[str, Any]], Optional[str]]:
+    """List one page of a user's data templates and the next page cursor"""
     db = get_database()
     data_templates = db.data_templates
 
-    docs = data_templates.find({"user_id": user_id})
-    templates = []
-    for doc in docs:
-        doc["_id"] = str(doc["_id"])
-        templates.append(DataTemplate(**doc))
-    return templates
+    return find_page(
+        data_templates,
+        {"user_id": user_id},
+        TEMPLATE_LIST_FIELDS,
+        limit,
+        cursor,
+    )
 
 
 def update_data_template(
@@ -87,6 +135,7 @@ def update_data_template(
         {"$set": update_fields},
     )
     if result.modified_count == 1:
+        invalidate_workbook_cache(template_id)
         return get_data_template_by_id(template_id)
     return None
 
@@ -97,6 +146,7 @@ def delete_data_template(template_id: str) -> bool:
     data_templates = db.data_templates
 
     result = data_templates.delete_one({"_id": ObjectId(template_id)})
+    invalidate_workbook_cache(template_id)
     return result.deleted_count == 1
 
 
@@ -117,24 +167,25 @@ def generate_xlsx_from_template(template: DataTemplate) -> BytesIO:
     return output
 
 
-def validate_dataframe_structure(
-    df: pd.DataFrame, template: DataTemplate
-) -> tuple[bool, Optional[str]]:
-    """Validate DataFrame columns match template"""
-    template_columns = set(template.columns.keys())
-    df_columns = set(df.columns)
+def workbook_cache_key(template: DataTemplate) -> tuple[str, str]:
+    return template.id, version_token(template.updated_at)
+
+
+def get_cached_workbook(template: DataTemplate) -> Optional[bytes]:
+    """Workbook bytes of a template if this version was already generated"""
+    return workbook_cache.get(workbook_cache_key(template))
+
 
-    if template_columns != df_columns:
-        missing = template_columns - df_columns
-        extra = df_columns - template_columns
-        error_parts = []
-        if missing:
-            error_parts.append(f"Missing columns: {', '.join(missing)}")
-        if extra:
-            error_parts.append(f"Extra columns: {', '.join(extra)}")
-        return False, "; ".join(error_parts)
+def build_template_workbook(template: DataTemplate) -> bytes:
+    """Generate a template's workbook and cache its bytes"""
+    content = generate_xlsx_from_template(template).getvalue()
+    workbook_cache.set(workbook_cache_key(template), content)
+    return content
 
-    return True, None
+
+def invalidate_workbook_cache(template_id: str) -> int:
+    """Drop cached workbooks of a template"""
+    return workbook_cache.invalidate(lambda key: key[0] == template_id)
 
 
 def create_data_metadata(
@@ -144,6 +195,10 @@ def create_data_metadata(
     dtypes: dict[str, str],
     num_rows: int,
     source_type: SourceType,
+    data_id: Optional[str] = None,
+    template_id: Optional[str] = None,
+    coerced: bool = False,
+    next_chunk: Optional[int] = None,
 ) -> DataMetadata:
     """Create metadata for uploaded data"""
     db = get_database()
@@ -152,24 +207,100 @@ def create_data_metadata(
     now = datetime.now(timezone.utc)
     metadata_dict = {
         "user_id": user_id,
+        "template_id": template_id,
         "name": name,
         "columns": columns,
         "dtypes": dtypes,
         "num_rows": num_rows,
         "source_type": source_type,
+        "coerced": coerced,
+        "next_chunk": next_chunk,
         "created_at": now,
         "updated_at": now,
     }
+    if data_id is not None:
+        metadata_dict["_id"] = ObjectId(data_id)
     result = data_metadata.insert_one(metadata_dict)
     metadata_dict["_id"] = str(result.inserted_id)
     return DataMetadata(**metadata_dict)
 
 
+def append_data_metadata(
+    data_id: str, ingest_id: str, num_rows: int, dtypes: dict[str, str]
+) -> Optional[DataMetadata]:
+    """Count appended rows once per append job and bump the dataset version"""
+    db = get_database()
+    data_metadata = db.data_metadata
+
+    doc = data_metadata.find_one_and_update(
+        {"_id": ObjectId(data_id), "append_ids": {"$ne": ingest_id}},
+        {
+            "$inc": {"num_rows": num_rows},
+            "$set": {"dtypes": dtypes, "updated_at": datetime.now(timezone.utc)},
+            "$push": {"append_ids": ingest_id},
+        },
+        return_document=True,
+    )
+    if doc:
+        doc["_id"] = str(doc["_id"])
+        return DataMetadata(**doc)
+    return None
+
+
+def claim_dataset_append(data_id: str, job_id: str) -> bool:
+    """Reserve a dataset for one append job, returning False if another holds it"""
+    db = get_database()
+    data_metadata = db.data_metadata
+
+    result = data_metadata.update_one(
+        {"_id": ObjectId(data_id), "append_job_id": None},
+        {"$set": {"append_job_id": job_id}},
+    )
+    return result.modified_count == 1
+
+
+def release_dataset_append(data_id: str, job_id: str) -> None:
+    """Free a dataset reserved by an append job once that job has finished"""
+    db = get_database()
+    data_metadata = db.data_metadata
+
+    data_metadata.update_one(
+        {"_id": ObjectId(data_id), "append_job_id": job_id},
+        {"$unset": {"append_job_id": ""}},
+    )
+
+
+def reserve_column_chunks(data_id: str, count: int) -> int:
+    """Atomically claim the next count chunk numbers of a dataset's column blocks"""
+    db = get_database()
+    data_metadata = db.data_metadata
+
+    query = {"_id": ObjectId(data_id), "next_chunk": {"$type": "number"}}
+    doc = data_metadata.find_one_and_update(
+        query, {"$inc": {"next_chunk": count}}, {"next_chunk": 1}
+    )
+    if doc is None:
+        # Datasets stored before the counter existed start after their last block
+        metadata = get_data_metadata_by_id(data_id)
+        if metadata is None:
+            raise ValueError("Data not found")
+        start = next_column_chunk(data_id, metadata.columns[0])
+        data_metadata.update_one(
+            {"_id": ObjectId(data_id), "next_chunk": {"$not": {"$type": "number"}}},
+            {"$set": {"next_chunk": start}},
+        )
+        doc = data_metadata.find_one_and_update(
+            query, {"$inc": {"next_chunk": count}}, {"next_chunk": 1}
+        )
+    return doc["next_chunk"]
+
+
 def create_data_documents(
     user_id: str,
     data_id: str,
     template_id: str,
     rows: List[Dict[str, Any]],
+    ingest_id: Optional[str] = None,
 ) -> int:
     """Create multiple data documents from rows"""
     db = get_database()
@@ -186,6 +317,8 @@ def create_data_documents(
             "created_at": now,
             "updated_at": now,
         }
+        if ingest_id:
+            doc["ingest_id"] = ingest_id
         documents.append(doc)
 
     if documents:
@@ -194,39 +327,265 @@ def create_data_documents(
     return 0
 
 
-def process_excel_upload(
-    file_content: bytes,
+def delete_dataset_rows(data_id: str) -> None:
+    """Delete the row documents and column blocks of a dataset"""
+    db = get_database()
+    db.data_documents.delete_many({"data_id": data_id})
+    delete_column_chunks(data_id)
+
+
+def delete_appended_rows(data_id: str, ingest_id: str) -> None:
+    """Delete the rows and column blocks one append job added to a dataset"""
+    db = get_database()
+    db.data_documents.delete_many({"data_id": data_id, "ingest_id": ingest_id})
+    delete_column_chunks(data_id, ingest_id)
+
+
+def store_batches(
+    batches: Iterable[pd.DataFrame],
     template: DataTemplate,
     user_id: str,
-    filename: str,
-) -> tuple[DataMetadata, int]:
-    """Process Excel file upload and store data"""
-    df = pd.read_excel(BytesIO(file_content))
+    data_id: str,
+    reserve_chunks: Optional[Callable[[int], int]] = None,
+    ingest_id: Optional[str] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+    on_invalid: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None,
+) -> tuple[Optional[List[str]], Dict[str, str], Dict[str, Any], int]:
+    """Insert batches of rows, returning their columns, dtypes, profile and count"""
+    columns = None
+    dtypes = {}
+    profile = {}
+    docs_created = 0
+    for batch in batches:
+        if columns is None:
+            columns = [str(col) for col in batch.columns]
+        # Each value is converted once here, so reads work on native types
+        batch, invalid_count, invalid_values = coerce_batch(
+            batch, template, docs_created + 1, settings.INGEST_INVALID_SAMPLE_LIMIT
+        )
+        if invalid_count and on_invalid:
+            on_invalid(invalid_count, invalid_values)
+        dtypes = merge_dtypes(dtypes, batch)
+        profile = merge_profiles(profile, build_profile(batch, template))
+        # Reported before every write, so a job whose lease was lost stops
+        # before touching the rows of the attempt that took it over
+        if on_progress:
+            on_progress(docs_created)
+        docs_created += create_data_documents(
+            user_id=user_id,
+            data_id=data_id,
+            template_id=template.id,
+            rows=to_records(batch),
+            ingest_id=ingest_id,
+        )
+        if reserve_chunks is not None:
+            write_column_chunks(data_id, batch, reserve_chunks, ingest_id=ingest_id)
+    # The last report also guards the caller's commit
+    if on_progress:
+        on_progress(docs_created)
+    return columns, dtypes, profile, docs_created
 
-    is_valid, error_msg = validate_dataframe_structure(df, template)
-    if not is_valid:
-        raise ValueError(error_msg)
 
-    df = df.fillna("")
-    rows = df.to_dict("records")
+def ingest_batches(
+    batches: Iterable[pd.DataFrame],
+    template: DataTemplate,
+    user_id: str,
+    filename: str,
+    source_type: SourceType,
+    data_id: Optional[str] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+    on_invalid: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None,
+) -> tuple[DataMetadata, int]:
+    """Store batches of rows as a new dataset, holding one batch in memory at a time"""
+    # Metadata is written last so a failed upload never shows up as a dataset;
+    # the caller deletes the rows of a failed attempt
+    data_id = data_id or str(ObjectId())
+    # Nothing else writes to the dataset yet, so chunk numbers are counted here
+    chunks = {"next": 0}
+
+    def reserve_chunks(count: int) -> int:
+        start = chunks["next"]
+        chunks["next"] += count
+        return start
+
+    columns, dtypes, profile, docs_created = store_batches(
+        batches,
+        template,
+        user_id,
+        data_id,
+        reserve_chunks=reserve_chunks,
+        on_progress=on_progress,
+        on_invalid=on_invalid,
+    )
 
     metadata = create_data_metadata(
         user_id=user_id,
         name=filename,
-        columns=list(df.columns),
-        dtypes={col: str(dtype) for col, dtype in df.dtypes.items()},
-        num_rows=len(df),
-        source_type=SourceType.EXCEL,
+        columns=columns or list(template.columns.keys()),
+        dtypes=dtypes,
+        num_rows=docs_created,
+        source_type=source_type,
+        data_id=data_id,
+        template_id=template.id,
+        coerced=True,
+        next_chunk=chunks["next"],
     )
+    save_committed_profile(metadata, template, profile)
+    return metadata, docs_created
 
-    docs_created = create_data_documents(
-        user_id=user_id,
-        data_id=metadata.id,
-        template_id=template.id,
-        rows=rows,
+
+def append_batches(
+    batches: Iterable[pd.DataFrame],
+    template: DataTemplate,
+    metadata: DataMetadata,
+    ingest_id: str,
+    on_progress: Optional[Callable[[int], None]] = None,
+    on_invalid: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None,
+) -> tuple[DataMetadata, int]:
+    """Add batches of rows to an existing dataset and bump its version"""
+    # As with new datasets, the caller deletes the rows of a failed attempt
+    # Datasets from before the column store have no blocks to extend; their
+    # frames keep loading from row documents
+    reserve_chunks = partial(reserve_column_chunks, metadata.id)
+    if (
+        metadata.next_chunk is None
+        and metadata.num_rows > 0
+        and next_column_chunk(metadata.id, metadata.columns[0]) == 0
+    ):
+        reserve_chunks = None
+
+    _, dtypes, profile, docs_created = store_batches(
+        batches,
+        template,
+        metadata.user_id,
+        metadata.id,
+        reserve_chunks=reserve_chunks,
+        ingest_id=ingest_id,
+        on_progress=on_progress,
+        on_invalid=on_invalid,
+    )
+
+    updated = append_data_metadata(
+        metadata.id, ingest_id, docs_created, merge_dtype_maps(metadata.dtypes, dtypes)
+    )
+    if updated is None:
+        # Another attempt of this job already applied it
+        return get_data_metadata_by_id(metadata.id), docs_created
+
+    # Column states merge, so the stored profile only needs the new rows
+    stored = get_data_profile(metadata.id)
+    if profile_is_current(stored, metadata, template):
+        save_committed_profile(
+            updated, template, merge_profiles(stored["columns"], profile)
+        )
+    return updated, docs_created
+
+
+def excel_batches(
+    file: Union[BinaryIO, bytes], template: DataTemplate, filename: str
+) -> Iterable[pd.DataFrame]:
+    """Validated batches of DATASET_CHUNK_ROWS rows from an Excel upload"""
+    if isinstance(file, bytes):
+        file = BytesIO(file)
+
+    batch_rows = settings.DATASET_CHUNK_ROWS
+    if filename.lower().endswith(".xls"):
+        # openpyxl can't stream the legacy format, so it is loaded whole
+        return iter_frame_batches(pd.read_excel(file), template, batch_rows)
+    return iter_excel_batches(file, template, batch_rows)
+
+
+def csv_batches(
+    file: Union[BinaryIO, bytes], template: DataTemplate
+) -> Iterable[pd.DataFrame]:
+    """Validated batches of DATASET_CHUNK_ROWS rows from a CSV upload"""
+    if isinstance(file, bytes):
+        file = BytesIO(file)
+    return iter_csv_batches(file, template, settings.DATASET_CHUNK_ROWS)
+
+
+def process_excel_upload(
+    file: Union[BinaryIO, bytes],
+    template: DataTemplate,
+    user_id: str,
+    filename: str,
+    data_id: Optional[str] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+    on_invalid: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None,
+) -> tuple[DataMetadata, int]:
+    """Process Excel file upload and store data in fixed-size batches"""
+    return ingest_batches(
+        excel_batches(file, template, filename),
+        template,
+        user_id,
+        filename,
+        SourceType.EXCEL,
+        data_id=data_id,
+        on_progress=on_progress,
+        on_invalid=on_invalid,
     )
 
-    return metadata, docs_created
+
+def process_excel_append(
+    file: Union[BinaryIO, bytes],
+    template: DataTemplate,
+    metadata: DataMetadata,
+    filename: str,
+    ingest_id: str,
+    on_progress: Optional[Callable[[int], None]] = None,
+    on_invalid: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None,
+) -> tuple[DataMetadata, int]:
+    """Append the rows of an Excel file to an existing dataset"""
+    return append_batches(
+        excel_batches(file, template, filename),
+        template,
+        metadata,
+        ingest_id,
+        on_progress=on_progress,
+        on_invalid=on_invalid,
+    )
+
+
+def process_csv_upload(
+    file: Union[BinaryIO, bytes],
+    template: DataTemplate,
+    user_id: str,
+    filename: str,
+    data_id: Optional[str] = None,
+    on_progress: Optional[Callable[[int], None]] = None,
+    on_invalid: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None,
+) -> tuple[DataMetadata, int]:
+    """Process CSV file upload, parsing and storing it in fixed-size batches"""
+    return ingest_batches(
+        csv_batches(file, template),
+        template,
+        user_id,
+        filename,
+        SourceType.CSV,
+        data_id=data_id,
+        on_progress=on_progress,
+        on_invalid=on_invalid,
+    )
+
+
+def process_csv_append(
+    file: Union[BinaryIO, bytes],
+    template: DataTemplate,
+    metadata: DataMetadata,
+    filename: str,
+    ingest_id: str,
+    on_progress: Optional[Callable[[int], None]] = None,
+    on_invalid: Optional[Callable[[int, List[Dict[str, Any]]], None]] = None,
+) -> tuple[DataMetadata, int]:
+    """Append the rows of a CSV file to an existing dataset"""
+    return append_batches(
+        csv_batches(file, template),
+        template,
+        metadata,
+        ingest_id,
+        on_progress=on_progress,
+        on_invalid=on_invalid,
+    )
 
 
 # Data analysis functions
@@ -242,30 +601,157 @@ def get_data_metadata_by_id(data_id: str) -> Optional[DataMetadata]:
     return None
 
 
-def get_data_documents_by_data_id(data_id: str) -> List[DataDocument]:
-    """Get all data documents for a specific data_id"""
+def version_token(updated_at: datetime) -> str:
+    """Comparable token of an updated_at timestamp"""
+    # Mongo keeps naive UTC datetimes at millisecond precision, so normalize
+    # to match whether the document was just written or read back
+    if updated_at.tzinfo is not None:
+        updated_at = updated_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return updated_at.isoformat(timespec="milliseconds")
+
+
+def dataset_version(metadata: DataMetadata) -> str:
+    """Token that changes whenever a dataset's rows change"""
+    return version_token(metadata.updated_at)
+
+
+def save_data_profile(
+    metadata: DataMetadata, template: DataTemplate, profile: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Store a dataset's column profile together with its finished analysis"""
+    db = get_database()
+    data_profiles = db.data_profiles
+
+    column_analyses = finalize_profile(profile, template)
+    profile_dict = {
+        "data_id": metadata.id,
+        "template_id": template.id,
+        "version": dataset_version(metadata),
+        "template_updated_at": template.updated_at.isoformat(),
+        "format": PROFILE_FORMAT,
+        "columns": profile,
+        "column_analyses": column_analyses,
+        "visualization_suggestions": suggest_visualizations(template, column_analyses),
+    }
+    data_profiles.replace_one({"_id": metadata.id}, profile_dict, upsert=True)
+    return profile_dict
+
+
+def save_committed_profile(
+    metadata: DataMetadata, template: DataTemplate, profile: Dict[str, Any]
+) -> None:
+    """Store the profile of rows already committed, without failing their upload"""
+    try:
+        save_data_profile(metadata, template, profile)
+    except Exception as e:
+        # A missing or outdated profile is rebuilt by the next analysis
+        print(f"Warning: could not store the profile of data {metadata.id}: {e}")
+
+
+def get_data_profile(data_id: str) -> Optional[Dict[str, Any]]:
+    """Get the stored column profile of a dataset"""
+    db = get_database()
+    data_profiles = db.data_profiles
+
+    return data_profiles.find_one({"_id": data_id})
+
+
+def profile_is_current(
+    profile: Optional[Dict[str, Any]], metadata: DataMetadata, template: DataTemplate
+) -> bool:
+    """Whether a stored profile was built from the current data and template"""
+    return (
+        profile is not None
+        and profile.get("format") == PROFILE_FORMAT
+        and profile["version"] == dataset_version(metadata)
+        and profile["template_updated_at"] == template.updated_at.isoformat()
+    )
+
+
+def load_dataset_frame(
+    data_id: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    metadata: Optional[DataMetadata] = None,
+) -> pd.DataFrame:
+    """Load a dataset as a DataFrame in a single scan, optionally projected to some columns"""
+    query = {"data_id": data_id}
+    if filters and metadata:
+        # Filtered loads read row documents so the database drops rows before
+        # transfer; filters on columns the dataset lacks are ignored
+        query.update(
+            compile_filters(
+                {
+                    col: spec
+                    for col, spec in filters.items()
+                    if is_pushdown_column(col, metadata)
+                },
+                metadata,
+            )
+        )
+    else:
+        frame = read_column_frame(data_id, columns)
+        if frame is not None:
+            return restore_dtypes(frame, metadata)
+
     db = get_database()
     data_documents = db.data_documents
 
-    docs = data_documents.find({"data_id": data_id})
-    documents = []
-    for doc in docs:
-        doc["_id"] = str(doc["_id"])
-        documents.append(DataDocument(**doc))
-    return documents
+    if columns is None:
+        projection = {"_id": 0, "row_data": 1}
+    elif not columns:
+        return pd.DataFrame()
+    else:
+        projection = {"_id": 0, **{f"row_data.{col}": 1 for col in columns}}
 
+    docs = data_documents.find(query, projection)
+    return restore_dtypes(
+        pd.DataFrame([doc.get("row_data", {}) for doc in docs]), metadata
+    )
 
-def list_data_metadata_by_user(user_id: str) -> List[DataMetadata]:
-    """List all data metadata for a user"""
+
+def restore_dtypes(df: pd.DataFrame, metadata: Optional[DataMetadata]) -> pd.DataFrame:
+    """Give columns typed at ingest back the dtype their nulls made pandas lose"""
+    if metadata is None:
+        return df
+    for col in df.columns:
+        dtype = metadata.dtypes.get(col)
+        # Uploads from before ingest coercion stored blank cells as "", so
+        # values that don't parse become nulls instead of failing the load
+        if dtype == "float64":
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        elif dtype == "boolean":
+            df[col] = df[col].astype("boolean")
+        elif dtype and dtype.startswith("datetime64"):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+
+def get_dataset_template_id(data_id: str) -> Optional[str]:
+    """Get the template a dataset was uploaded with"""
+    db = get_database()
+    data_documents = db.data_documents
+
+    doc = data_documents.find_one({"data_id": data_id}, {"template_id": 1})
+    if doc:
+        return doc["template_id"]
+    return None
+
+
+def list_data_metadata_by_user(
+    user_id: str, limit: int, cursor: Optional[str] = None
+) -> tuple[List[Dict[str, Any]], Optional[str]]:
+    """List one page of a user's data metadata and the next page cursor"""
     db = get_database()
     data_metadata = db.data_metadata
 
-    docs = data_metadata.find({"user_id": user_id}).sort("created_at", -1)
-    metadata_list = []
-    for doc in docs:
-        doc["_id"] = str(doc["_id"])
-        metadata_list.append(DataMetadata(**doc))
-    return metadata_list
+    return find_page(
+        data_metadata,
+        {"user_id": user_id},
+        DATA_LIST_FIELDS,
+        limit,
+        cursor,
+    )
 
 
 def get_data_documents_preview(data_id: str, limit: int = 50) -> List[Dict[str, Any]]:
@@ -280,87 +766,73 @@ def get_data_documents_preview(data_id: str, limit: int = 50) -> List[Dict[str,
     return preview
 
 
-def analyze_column(
-    column_name: str, column_type: str, values: List[Any]
-) -> Dict[str, Any]:
-    """Analyze a single column and return statistics"""
-    clean_values = [v for v in values if v != "" and v is not None]
-    total_count = len(values)
-    non_null_count = len(clean_values)
-    null_count = total_count - non_null_count
-
-    analysis = {
-        "column_name": column_name,
-        "column_type": column_type,
-        "total_count": total_count,
-        "non_null_count": non_null_count,
-        "null_count": null_count,
-        "null_percentage": (
-            round((null_count / total_count * 100), 2) if total_count > 0 else 0
-        ),
-    }
-
-    if column_type == ColumnType.NUMBER and clean_values:
-        numeric_values = [
-            float(v)
-            for v in clean_values
-            if isinstance(v, (int, float))
-            or str(v).replace(".", "", 1).replace("-", "", 1).isdigit()
-        ]
-        if numeric_values:
-            analysis.update(
-                {
-                    "min": min(numeric_values),
-                    "max": max(numeric_values),
-                    "avg": round(sum(numeric_values) / len(numeric_values), 2),
-                    "sum": round(sum(numeric_values), 2),
-                }
-            )
-
-    elif column_type == ColumnType.TEXT and clean_values:
-        unique_values = list(set(clean_values))
-        analysis.update(
-            {
-                "unique_count": len(unique_values),
-                "sample_values": unique_values[:5],
-                "is_categorical": len(unique_values) <= 20,
-            }
-        )
+def browse_data_documents(
+    metadata: DataMetadata,
+    limit: int,
+    cursor: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    sort: Optional[str] = None,
+    descending: bool = False,
+    filters: Optional[Dict[str, Any]] = None,
+) -> tuple[List[Dict[str, Any]], Optional[str]]:
+    """Get one page of rows, filtered and sorted in the database, and the next cursor"""
+    db = get_database()
+    data_documents = db.data_documents
 
-    elif column_type == ColumnType.DATE and clean_values:
-        analysis.update(
-            {
-                "min_date": str(min(clean_values)),
-                "max_date": str(max(clean_values)),
-                "date_range_days": (
-                    (
-                        pd.to_datetime(max(clean_values))
-                        - pd.to_datetime(min(clean_values))
-                    ).days
-                    if len(clean_values) > 1
-                    else 0
-                ),
+    columns = columns or metadata.columns
+    for col in columns + ([sort] if sort else []):
+        if not is_pushdown_column(col, metadata):
+            raise ValueError(f"Unknown column: {col}")
+
+    match = {"data_id": metadata.id, **compile_filters(filters, metadata)}
+    direction = -1 if descending else 1
+    after = "$lt" if descending else "$gt"
+
+    if sort is None:
+        # Row order is insertion order, served straight from the data_id/_id index
+        if cursor:
+            _, last_id = decode_row_cursor(cursor)
+            match["_id"] = {after: last_id}
+        order = {"_id": direction}
+    else:
+        field = f"$row_data.{sort}"
+        if cursor:
+            last_value, last_id = decode_row_cursor(cursor)
+            # $expr compares across BSON types, so mixed columns (numbers and
+            # "" for empty cells) page the same way $sort orders them
+            match["$expr"] = {
+                "$or": [
+                    {after: [field, last_value]},
+                    {
+                        "$and": [
+                            {"$eq": [field, last_value]},
+                            {after: ["$_id", last_id]},
+                        ]
+                    },
+                ]
             }
-        )
+        order = {f"row_data.{sort}": direction, "_id": direction}
+
+    projected = set(columns) | ({sort} if sort else set())
+    pipeline = [
+        {"$match": match},
+        {"$sort": order},
+        {"$limit": limit + 1},
+        {"$project": {f"row_data.{col}": 1 for col in projected}},
+    ]
+    docs = list(data_documents.aggregate(pipeline, allowDiskUse=True))
 
-    elif column_type == ColumnType.BOOLEAN and clean_values:
-        true_count = sum(
-            1 for v in clean_values if str(v).lower() in ["true", "1", "yes", "si"]
-        )
-        false_count = non_null_count - true_count
-        analysis.update(
-            {
-                "true_count": true_count,
-                "false_count": false_count,
-                "true_percentage": (
-                    round((true_count / non_null_count * 100), 2)
-                    if non_null_count > 0
-                    else 0
-                ),
-            }
-        )
+    next_cursor = None
+    if len(docs) > limit:
+        last = docs[limit - 1]
+        last_value = last.get("row_data", {}).get(sort) if sort else None
+        next_cursor = encode_row_cursor(last_value, last["_id"])
 
-    return analysis
+    rows = []
+    for doc in docs[:limit]:
+        row_data = doc.get("row_data", {})
+        rows.append({col: row_data.get(col) for col in columns})
+    return rows, next_cursor
 
 
 def suggest_visualizations(
@@ -477,27 +949,20 @@ def analyze_data(data_id: str, template_id: str) -> Dict[str, Any]:
     if not template:
         raise ValueError("Template not found")
 
-    documents = get_data_documents_by_data_id(data_id)
-    if not documents:
-        raise ValueError("No data documents found")
-
-    column_data = {col: [] for col in template.columns.keys()}
-    for doc in documents:
-        for col in template.columns.keys():
-            column_data[col].append(doc.row_data.get(col))
-
-    column_analyses = []
-    for col_name, col_type in template.columns.items():
-        analysis = analyze_column(col_name, col_type, column_data[col_name])
-        column_analyses.append(analysis)
-
-    suggestions = suggest_visualizations(template, column_analyses)
+    # The profile is computed at upload time; only rebuild it when it is
+    # missing (older uploads), in an older format, or the data or template changed
+    profile = get_data_profile(data_id)
+    if not profile_is_current(profile, metadata, template):
+        df = load_dataset_frame(data_id, list(template.columns.keys()))
+        if df.empty:
+            raise ValueError("No data documents found")
+        profile = save_data_profile(metadata, template, build_profile(df, template))
 
     return {
         "data_id": data_id,
         "template_id": template_id,
         "num_rows": metadata.num_rows,
         "num_columns": len(template.columns),
-        "column_analyses": column_analyses,
-        "visualization_suggestions": suggestions,
+        "column_analyses": profile["column_analyses"],
+        "visualization_suggestions": profile["visualization_suggestions"],
     }
@@ -0,0 +1,177 @@
+import csv
+import io
+import tempfile
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Iterator, BinaryIO
+from app.models.models import DataMetadata
+from app.models.mongo import get_database
+from app.crud.filters import compile_filters
+from app.crud.pipeline import is_pushdown_column, native_dtype
+from app.settings import settings
+from openpyxl import Workbook
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Workbooks and Parquet files are zipped or footed, so they are assembled in a
+# temporary file that only spills to disk past this size
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+READ_BLOCK_BYTES = 1024 * 1024
+
+
+def export_columns(metadata: DataMetadata, columns: Optional[List[str]]) -> List[str]:
+    """Columns to export, raising ValueError for ones the dataset lacks"""
+    columns = columns or metadata.columns
+    for col in columns:
+        if not is_pushdown_column(col, metadata):
+            raise ValueError(f"Unknown column: {col}")
+    return columns
+
+
+def iter_row_batches(
+    metadata: DataMetadata,
+    columns: List[str],
+    filters: Optional[Dict[str, Any]] = None,
+) -> Iterator[List[List[Any]]]:
+    """Stream a dataset's rows in upload order, EXPORT_BATCH_ROWS at a time"""
+    db = get_database()
+    data_documents = db.data_documents
+
+    batch_rows = settings.EXPORT_BATCH_ROWS
+    query = {"data_id": metadata.id, **compile_filters(filters, metadata)}
+    projection = {"_id": 0, **{f"row_data.{col}": 1 for col in columns}}
+    cursor = (
+        data_documents.find(query, projection).sort("_id", 1).batch_size(batch_rows)
+    )
+    try:
+        batch = []
+        for doc in cursor:
+            row_data = doc.get("row_data", {})
+            batch.append([row_data.get(col) for col in columns])
+            if len(batch) >= batch_rows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        cursor.close()
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_csv(
+    metadata: DataMetadata,
+    columns: List[str],
+    filters: Optional[Dict[str, Any]] = None,
+) -> Iterator[bytes]:
+    """Encode a dataset as CSV, one chunk per row batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode("utf-8")
+
+    for batch in iter_row_batches(metadata, columns, filters):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _stream_file(file: BinaryIO) -> Iterator[bytes]:
+    try:
+        file.seek(0)
+        while chunk := file.read(READ_BLOCK_BYTES):
+            yield chunk
+    finally:
+        file.close()
+
+
+def export_xlsx(
+    metadata: DataMetadata,
+    columns: List[str],
+    filters: Optional[Dict[str, Any]] = None,
+) -> Iterator[bytes]:
+    """Encode a dataset as an .xlsx workbook written row by row"""
+    # Write-only sheets flush rows to disk as they are appended
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Data")
+    sheet.append(columns)
+    for batch in iter_row_batches(metadata, columns, filters):
+        for row in batch:
+            sheet.append(row)
+
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    workbook.save(output)
+    yield from _stream_file(output)
+
+
+def _arrow_type(dtype: Optional[str]) -> Any:
+    import pyarrow as pa
+
+    if dtype == "float64":
+        return pa.float64()
+    if dtype == "int64":
+        return pa.int64()
+    if dtype == "boolean" or dtype == "bool":
+        return pa.bool_()
+    if dtype and dtype.startswith("datetime64"):
+        return pa.timestamp("ms")
+    return pa.string()
+
+
+def export_parquet(
+    metadata: DataMetadata,
+    columns: List[str],
+    filters: Optional[Dict[str, Any]] = None,
+) -> Iterator[bytes]:
+    """Encode a dataset as Parquet, one row group per row batch"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Legacy datasets can hold "" in typed columns, so they export as text
+    schema = pa.schema(
+        [(col, _arrow_type(native_dtype(col, metadata))) for col in columns]
+    )
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    with pq.ParquetWriter(output, schema) as writer:
+        for batch in iter_row_batches(metadata, columns, filters):
+            arrays = []
+            for idx, field in enumerate(schema):
+                values = [row[idx] for row in batch]
+                if pa.types.is_string(field.type):
+                    # Untyped columns can mix kinds, so text is the common ground
+                    values = [None if v is None else str(v) for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    yield from _stream_file(output)
+
+
+def export_dataset(
+    metadata: DataMetadata,
+    export_format: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Iterator[bytes]:
+    """Validate an export request and return the generator of its bytes"""
+    columns = export_columns(metadata, columns)
+    # Compiled up front so bad filters fail before the response starts
+    compile_filters(filters, metadata)
+    if export_format == "csv":
+        return export_csv(metadata, columns, filters)
+    if export_format == "xlsx":
+        return export_xlsx(metadata, columns, filters)
+    if export_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Parquet export needs the pyarrow package installed")
+        return export_parquet(metadata, columns, filters)
+    raise ValueError(f"Unsupported export format: {export_format}")
@@ -0,0 +1,180 @@
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any
+from app.models.models import DataMetadata
+from app.crud.profile import null_mask
+import numpy as np
+import pandas as pd
+
+# Filter values are either a literal (equality) or a dict of operators, e.g.
+# {"region": "North", "sales": {"gte": 100, "lt": 500}, "date": {"last": "30d"}}
+FILTER_OPERATORS = {
+    "eq": "$eq",
+    "ne": "$ne",
+    "gt": "$gt",
+    "gte": "$gte",
+    "lt": "$lt",
+    "lte": "$lte",
+    "in": "$in",
+    "nin": "$nin",
+}
+# Empty cells are stored as null; datasets uploaded before ingest typing
+# stored them as "", so both count as null
+NULL_VALUES = [None, ""]
+WINDOW_UNITS = {"h": "hours", "d": "days", "w": "weeks"}
+
+
+def _coerce_value(value: Any, dtype: Optional[str]) -> Any:
+    # Dates are stored as BSON dates, so ISO strings must be parsed to compare
+    if dtype and dtype.startswith("datetime64") and isinstance(value, str):
+        try:
+            timestamp = pd.Timestamp(value)
+        except ValueError:
+            raise ValueError(f"Invalid date: {value}")
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+        return timestamp.to_pydatetime()
+    if isinstance(value, list):
+        return [_coerce_value(item, dtype) for item in value]
+    return value
+
+
+def _window_start(window: Any) -> datetime:
+    match = re.fullmatch(r"(\d+)([hdw])", str(window))
+    if not match:
+        raise ValueError(f"Invalid date window: {window}, expected e.g. 12h, 30d, 4w")
+    delta = timedelta(**{WINDOW_UNITS[match.group(2)]: int(match.group(1))})
+    # Mongo stores naive UTC datetimes
+    return datetime.now(timezone.utc).replace(tzinfo=None) - delta
+
+
+def normalize_filter(spec: Any, dtype: Optional[str] = None) -> List[tuple[str, Any]]:
+    """Expand one column's filter spec into (operator, value) conditions"""
+    if not isinstance(spec, dict):
+        return [("eq", _coerce_value(spec, dtype))]
+
+    conditions = []
+    for operator, value in spec.items():
+        if operator == "between":
+            if not isinstance(value, list) or len(value) != 2:
+                raise ValueError("Filter operator between expects [start, end]")
+            conditions.append(("gte", _coerce_value(value[0], dtype)))
+            conditions.append(("lte", _coerce_value(value[1], dtype)))
+        elif operator == "last":
+            conditions.append(("gte", _window_start(value)))
+        elif operator == "is_null":
+            if not isinstance(value, bool):
+                raise ValueError("Filter operator is_null expects true or false")
+            conditions.append(("is_null", value))
+        elif operator == "prefix":
+            if not isinstance(value, str):
+                raise ValueError("Filter operator prefix expects a string")
+            conditions.append(("prefix", value))
+        elif operator in FILTER_OPERATORS:
+            if operator in ("in", "nin") and not isinstance(value, list):
+                raise ValueError(f"Filter operator {operator} expects a list")
+            conditions.append((operator, _coerce_value(value, dtype)))
+        else:
+            raise ValueError(f"Unknown filter operator: {operator}")
+    return conditions
+
+
+def validate_filters(filters: Optional[Dict[str, Any]]) -> None:
+    """Raise ValueError if a filter spec is malformed"""
+    if filters is None:
+        return
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object of column filters")
+    for spec in filters.values():
+        normalize_filter(spec)
+
+
+def has_relative_window(filters: Optional[Dict[str, Any]]) -> bool:
+    """Whether filters depend on the current time, e.g. {"last": "30d"}"""
+    return any(
+        isinstance(spec, dict) and "last" in spec for spec in (filters or {}).values()
+    )
+
+
+def compile_predicate(spec: Any, dtype: Optional[str] = None) -> Dict[str, Any]:
+    """Compile one column's filter spec into a Mongo query predicate"""
+    predicate = {}
+    for operator, value in normalize_filter(spec, dtype):
+        if operator == "is_null":
+            key, value = ("$in" if value else "$nin"), NULL_VALUES
+        elif operator == "prefix":
+            # Anchored, case-sensitive regexes can be answered from an index
+            key, value = "$regex", f"^{re.escape(value)}"
+        else:
+            key = FILTER_OPERATORS[operator]
+        if key in predicate:
+            raise ValueError(f"Conflicting filter operators on {key[1:]}")
+        predicate[key] = value
+    return predicate
+
+
+def compile_filters(
+    filters: Optional[Dict[str, Any]], metadata: DataMetadata
+) -> Dict[str, Any]:
+    """Compile column filters into query predicates on a dataset's row documents"""
+    query = {}
+    for col, spec in (filters or {}).items():
+        if col not in metadata.columns:
+            raise ValueError(f"Unknown column: {col}")
+        if "." in col or col.startswith("$"):
+            raise ValueError(f"Column cannot be filtered: {col}")
+        query[f"row_data.{col}"] = compile_predicate(spec, metadata.dtypes.get(col))
+    return query
+
+
+def _ordered_compare(series: pd.Series, operator: str, value: Any) -> np.ndarray:
+    # Like Mongo, only values of the same kind as the bound can match a range
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        comparable = pd.to_numeric(series, errors="coerce")
+        valid = comparable.notna().to_numpy()
+    elif isinstance(value, datetime):
+        comparable = pd.to_datetime(series, errors="coerce")
+        valid = comparable.notna().to_numpy()
+    else:
+        comparable = series
+        valid = series.map(lambda v: isinstance(v, type(value))).to_numpy()
+
+    result = np.zeros(len(series), dtype=bool)
+    if valid.any():
+        subset = comparable[valid]
+        if operator == "gt":
+            result[valid] = (subset > value).to_numpy()
+        elif operator == "gte":
+            result[valid] = (subset >= value).to_numpy()
+        elif operator == "lt":
+            result[valid] = (subset < value).to_numpy()
+        else:
+            result[valid] = (subset <= value).to_numpy()
+    return result
+
+
+def filter_mask(df: pd.DataFrame, filters: Optional[Dict[str, Any]]) -> np.ndarray:
+    """Rows of a frame matching the filters; filters on absent columns are ignored"""
+    mask = np.ones(len(df), dtype=bool)
+    for col, spec in (filters or {}).items():
+        if col not in df.columns:
+            continue
+        series = df[col]
+        for operator, value in normalize_filter(spec, str(series.dtype)):
+            if operator == "eq":
+                mask &= (series == value).to_numpy()
+            elif operator == "ne":
+                mask &= (series != value).to_numpy()
+            elif operator == "in":
+                mask &= series.isin(value).to_numpy()
+            elif operator == "nin":
+                mask &= ~series.isin(value).to_numpy()
+            elif operator == "is_null":
+                mask &= null_mask(series) == value
+            elif operator == "prefix":
+                mask &= series.map(
+                    lambda v: isinstance(v, str) and v.startswith(value)
+                ).to_numpy(dtype=bool)
+            else:
+                mask &= _ordered_compare(series, operator, value)
+    return mask
@@ -0,0 +1,220 @@
+from datetime import date
+from typing import Optional, List, Dict, Any, BinaryIO, Iterator
+from app.models.models import DataTemplate, ColumnType
+from app.crud.profile import TRUE_VALUES
+from openpyxl import load_workbook
+import numpy as np
+import pandas as pd
+
+FALSE_VALUES = ["false", "0", "no"]
+
+
+def validate_columns(
+    columns: List[str], template: DataTemplate
+) -> tuple[bool, Optional[str]]:
+    """Validate a header row matches the template columns"""
+    template_columns = set(template.columns.keys())
+    file_columns = set(columns)
+
+    if template_columns != file_columns:
+        missing = template_columns - file_columns
+        extra = file_columns - template_columns
+        error_parts = []
+        if missing:
+            error_parts.append(f"Missing columns: {', '.join(missing)}")
+        if extra:
+            error_parts.append(f"Extra columns: {', '.join(extra)}")
+        return False, "; ".join(error_parts)
+
+    return True, None
+
+
+def merge_dtypes(current: dict[str, str], batch: pd.DataFrame) -> dict[str, str]:
+    """Combine per-batch pandas dtypes into the dtype of the whole column"""
+    return merge_dtype_maps(
+        current, {str(col): str(dtype) for col, dtype in batch.dtypes.items()}
+    )
+
+
+def merge_dtype_maps(current: dict[str, str], other: dict[str, str]) -> dict[str, str]:
+    """Combine the column dtypes of two parts of a dataset"""
+    merged = dict(current)
+    for col, dtype in other.items():
+        previous = merged.get(col)
+        if previous is None or previous == dtype:
+            merged[col] = dtype
+        elif previous in ("int64", "float64") and dtype in ("int64", "float64"):
+            merged[col] = "float64"
+        else:
+            merged[col] = "object"
+    return merged
+
+
+def _blank_mask(series: pd.Series) -> np.ndarray:
+    mask = series.isna().to_numpy()
+    if series.dtype == object:
+        mask |= series.map(lambda v: isinstance(v, str) and not v.strip()).to_numpy(
+            dtype=bool
+        )
+    return mask
+
+
+def _coerce_dates(series: pd.Series) -> pd.Series:
+    if series.dtype == object:
+        # Numbers would parse as nanoseconds since the epoch, so only text and
+        # date cells are candidates
+        series = series.where(
+            series.map(lambda v: isinstance(v, (str, date))).to_numpy(dtype=bool)
+        )
+    dates = pd.to_datetime(series, errors="coerce", utc=True)
+    retry = dates.isna().to_numpy() & series.notna().to_numpy()
+    if retry.any():
+        # The fast path infers one format from the first value; mixed formats
+        # fall back to parsing each remaining value on its own
+        dates[retry] = pd.to_datetime(
+            series[retry], errors="coerce", utc=True, format="mixed"
+        )
+    # Mongo stores naive UTC datetimes
+    return dates.dt.tz_localize(None)
+
+
+def _coerce_booleans(series: pd.Series) -> pd.Series:
+    if series.dtype == bool:
+        return series
+    text = series.astype(str).str.strip().str.lower()
+    numeric = pd.to_numeric(series, errors="coerce")
+    result = pd.Series(pd.NA, index=series.index, dtype="boolean")
+    result[text.isin(TRUE_VALUES) | (numeric == 1)] = True
+    result[text.isin(FALSE_VALUES) | (numeric == 0)] = False
+    return result
+
+
+def coerce_column(series: pd.Series, column_type: str) -> pd.Series:
+    """Convert a column to the native type of its template column; bad values become null"""
+    blank = _blank_mask(series)
+    if blank.any():
+        series = series.mask(blank)
+
+    if column_type == ColumnType.NUMBER:
+        if series.dtype == object:
+            series = series.map(lambda v: v.strip() if isinstance(v, str) else v)
+        return pd.to_numeric(series, errors="coerce").astype("float64")
+    if column_type == ColumnType.DATE:
+        return _coerce_dates(series)
+    if column_type == ColumnType.BOOLEAN:
+        return _coerce_booleans(series)
+    # Text and email cells keep their text; numbers typed into them become text
+    return series.map(lambda v: v if isinstance(v, str) or pd.isna(v) else str(v))
+
+
+def coerce_batch(
+    batch: pd.DataFrame, template: DataTemplate, first_row: int, max_invalid: int
+) -> tuple[pd.DataFrame, int, List[Dict[str, Any]]]:
+    """Coerce every template column of a batch, reporting values that didn't convert"""
+    coerced = {}
+    invalid_count = 0
+    invalid_values = []
+    for col in batch.columns:
+        series = batch[col]
+        column_type = template.columns.get(str(col), ColumnType.TEXT)
+        converted = coerce_column(series, column_type)
+        invalid = converted.isna().to_numpy() & ~_blank_mask(series)
+        if invalid.any():
+            invalid_count += int(invalid.sum())
+            for position in np.flatnonzero(invalid)[
+                : max_invalid - len(invalid_values)
+            ]:
+                invalid_values.append(
+                    {
+                        "row": first_row + int(position),
+                        "column": str(col),
+                        "value": str(series.iloc[position])[:100],
+                        "expected": column_type,
+                    }
+                )
+        coerced[col] = converted
+    return pd.DataFrame(coerced, index=batch.index), invalid_count, invalid_values
+
+
+def to_records(batch: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Rows of a coerced batch with every kind of null stored as a real null"""
+    # NaN, NaT and pd.NA would otherwise reach BSON as floats or fail to encode
+    return batch.astype(object).where(batch.notna(), None).to_dict("records")
+
+
+def _header(row: tuple[Any, ...]) -> List[str]:
+    columns = list(row)
+    # Read-only sheets can report trailing empty cells past the last column
+    while columns and columns[-1] is None:
+        columns.pop()
+    return [str(col) for col in columns]
+
+
+def iter_excel_batches(
+    file: BinaryIO, template: DataTemplate, batch_rows: int
+) -> Iterator[pd.DataFrame]:
+    """Stream the first sheet of an .xlsx file as DataFrames of batch_rows rows"""
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        columns = _header(next(rows, ()))
+
+        is_valid, error_msg = validate_columns(columns, template)
+        if not is_valid:
+            raise ValueError(error_msg)
+
+        width = len(columns)
+        batch = []
+        for row in rows:
+            values = row[:width]
+            if all(value is None for value in values):
+                continue
+            batch.append(values + (None,) * (width - len(values)))
+            if len(batch) >= batch_rows:
+                yield pd.DataFrame(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_csv_batches(
+    file: BinaryIO, template: DataTemplate, batch_rows: int
+) -> Iterator[pd.DataFrame]:
+    """Stream a CSV file as DataFrames of batch_rows rows"""
+    # utf-8-sig drops the byte order mark spreadsheet exports start with
+    header = pd.read_csv(file, nrows=0, encoding="utf-8-sig")
+    is_valid, error_msg = validate_columns(
+        [str(col) for col in header.columns], template
+    )
+    if not is_valid:
+        raise ValueError(error_msg)
+
+    file.seek(0)
+    # Cells are read as the text in the file, so coerce_batch alone applies the
+    # template types: no guessed floats eating leading zeros, and no "NA" or
+    # "null" text turned into nulls. Empty cells arrive as "" and count as blank
+    with pd.read_csv(
+        file,
+        chunksize=batch_rows,
+        encoding="utf-8-sig",
+        skip_blank_lines=True,
+        dtype=str,
+        keep_default_na=False,
+    ) as reader:
+        for batch in reader:
+            # Keep row positions per batch, like the Excel reader
+            yield batch.reset_index(drop=True)
+
+
+def iter_frame_batches(
+    df: pd.DataFrame, template: DataTemplate, batch_rows: int
+) -> Iterator[pd.DataFrame]:
+    """Split an already loaded DataFrame into batches, validating it first"""
+    is_valid, error_msg = validate_columns([str(col) for col in df.columns], template)
+    if not is_valid:
+        raise ValueError(error_msg)
+
+    for start in range(0, len(df), batch_rows):
+        yield df.iloc[start : start + batch_rows]
@@ -0,0 +1,158 @@
+from typing import Optional, List, Any
+from app.models.models import IngestJob, JobStatus, SourceType
+from app.models.mongo import get_database
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+
+
+class IngestJobSuperseded(Exception):
+    """Raised when a job attempt finds that a newer attempt has taken it over"""
+
+
+def create_ingest_job(
+    user_id: str,
+    template_id: str,
+    filename: str,
+    file_path: str,
+    source_type: SourceType,
+    data_id: Optional[str] = None,
+    append: bool = False,
+    job_id: Optional[str] = None,
+) -> IngestJob:
+    """Queue a new ingestion job for a saved upload"""
+    db = get_database()
+    ingest_jobs = db.ingest_jobs
+
+    now = datetime.now(timezone.utc)
+    job_dict = {
+        "user_id": user_id,
+        "template_id": template_id,
+        "filename": filename,
+        "file_path": file_path,
+        "source_type": source_type,
+        "status": JobStatus.QUEUED,
+        "data_id": data_id or str(ObjectId()),
+        "append": append,
+        "rows_processed": 0,
+        "rows_per_second": 0,
+        "error": None,
+        "attempts": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    if job_id is not None:
+        job_dict["_id"] = ObjectId(job_id)
+    result = ingest_jobs.insert_one(job_dict)
+    job_dict["_id"] = str(result.inserted_id)
+    return IngestJob(**job_dict)
+
+
+def get_ingest_job(job_id: str) -> Optional[IngestJob]:
+    """Get an ingestion job by ID"""
+    db = get_database()
+    ingest_jobs = db.ingest_jobs
+
+    doc = ingest_jobs.find_one({"_id": ObjectId(job_id)})
+    if doc:
+        doc["_id"] = str(doc["_id"])
+        return IngestJob(**doc)
+    return None
+
+
+def claim_ingest_job(job_id: str) -> Optional[IngestJob]:
+    """Atomically move a queued job to running so only one worker processes it"""
+    db = get_database()
+    ingest_jobs = db.ingest_jobs
+
+    now = datetime.now(timezone.utc)
+    doc = ingest_jobs.find_one_and_update(
+        {"_id": ObjectId(job_id), "status": JobStatus.QUEUED},
+        {
+            "$set": {
+                "status": JobStatus.RUNNING,
+                "rows_processed": 0,
+                "rows_per_second": 0,
+                "error": None,
+                "started_at": now,
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        return_document=True,
+    )
+    if doc:
+        doc["_id"] = str(doc["_id"])
+        return IngestJob(**doc)
+    return None
+
+
+def update_ingest_job(
+    job_id: str, attempt: Optional[int] = None, **fields: Any
+) -> bool:
+    """Update job fields and refresh its heartbeat, only while attempt still runs it"""
+    db = get_database()
+    ingest_jobs = db.ingest_jobs
+
+    query = {"_id": ObjectId(job_id)}
+    if attempt is not None:
+        query.update(status=JobStatus.RUNNING, attempts=attempt)
+    fields["updated_at"] = datetime.now(timezone.utc)
+    result = ingest_jobs.update_one(query, {"$set": fields})
+    return result.matched_count == 1
+
+
+def requeue_stale_ingest_jobs(stale_after_seconds: int) -> List[IngestJob]:
+    """Requeue jobs left queued, or running without a recent heartbeat, by a dead worker"""
+    db = get_database()
+    ingest_jobs = db.ingest_jobs
+
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=stale_after_seconds)
+    ingest_jobs.update_many(
+        {"status": JobStatus.RUNNING, "updated_at": {"$lt": cutoff}},
+        {"$set": {"status": JobStatus.QUEUED, "updated_at": cutoff}},
+    )
+
+    jobs = []
+    for doc in ingest_jobs.find(
+        {"status": JobStatus.QUEUED, "updated_at": {"$lte": cutoff}}
+    ):
+        # Restarting the clock keeps the next sweep from submitting a job that
+        # is still waiting in the pool a second time
+        touched = ingest_jobs.update_one(
+            {
+                "_id": doc["_id"],
+                "status": JobStatus.QUEUED,
+                "updated_at": {"$lte": cutoff},
+            },
+            {"$set": {"updated_at": datetime.now(timezone.utc)}},
+        )
+        if touched.modified_count == 1:
+            doc["_id"] = str(doc["_id"])
+            jobs.append(IngestJob(**doc))
+    return jobs
+
+
+def fail_ingest_job(job_id: str, error: str, attempt: Optional[int] = None) -> bool:
+    """Mark a job failed unless it already finished, returning whether it changed"""
+    db = get_database()
+    ingest_jobs = db.ingest_jobs
+
+    query = {
+        "_id": ObjectId(job_id),
+        "status": {"$in": [JobStatus.QUEUED, JobStatus.RUNNING]},
+    }
+    if attempt is not None:
+        query.update(status=JobStatus.RUNNING, attempts=attempt)
+    now = datetime.now(timezone.utc)
+    result = ingest_jobs.update_one(
+        query,
+        {
+            "$set": {
+                "status": JobStatus.FAILED,
+                "error": error,
+                "finished_at": now,
+                "updated_at": now,
+            }
+        },
+    )
+    return result.modified_count == 1
@@ -0,0 +1,70 @@
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+from pymongo import DESCENDING
+from pymongo.collection import Collection
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """Opaque cursor pointing just past a document in (created_at, _id) order"""
+    raw = f"{doc['created_at'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, ObjectId]:
+    """Parse a cursor, raising ValueError if it was not made by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, object_id = raw.split("|")
+        return datetime.fromisoformat(created_at), ObjectId(object_id)
+    except (UnicodeError, ValueError, InvalidId) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def encode_row_cursor(value: Any, object_id: ObjectId) -> str:
+    """Opaque cursor for a row page sorted by (value, _id)"""
+    raw = json_util.dumps({"value": value, "id": object_id})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_row_cursor(cursor: str) -> tuple[Any, ObjectId]:
+    """Parse a row cursor, raising ValueError if it was not made by encode_row_cursor"""
+    try:
+        raw = json_util.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return raw["value"], ObjectId(raw["id"])
+    except (UnicodeError, ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def find_page(
+    collection: Collection,
+    query: Dict[str, Any],
+    projection: Optional[Union[List[str], Dict[str, Any]]],
+    limit: int,
+    cursor: Optional[str] = None,
+) -> tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page, newest first, and the cursor of the next page if any"""
+    # Keyset pagination: seek past the last seen key instead of skipping, so
+    # deep pages cost the same as the first one
+    if cursor:
+        created_at, object_id = decode_cursor(cursor)
+        query = {
+            **query,
+            "$or": [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": object_id}},
+            ],
+        }
+
+    docs = list(
+        collection.find(query, projection)
+        .sort([("created_at", DESCENDING), ("_id", DESCENDING)])
+        .limit(limit + 1)
+    )
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    docs = docs[:limit]
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+    return docs, next_cursor
@@ -0,0 +1,506 @@
+from typing import Optional, List, Dict, Any
+from app.models.models import DataMetadata, AggregationType, TimeGranularity
+from app.models.mongo import get_database
+from app.crud.filters import compile_filters
+from pymongo.errors import OperationFailure
+import pandas as pd
+
+TABLE_ROW_LIMIT = 100
+OTHER_LABEL = "Other"
+NUMERIC_DTYPES = ("float64", "int64")
+
+GROUP_OPERATORS = {
+    AggregationType.SUM: "$sum",
+    AggregationType.AVG: "$avg",
+    AggregationType.MIN: "$min",
+    AggregationType.MAX: "$max",
+}
+
+
+def field_path(col: str) -> str:
+    return f"$row_data.{col}"
+
+
+def native_dtype(col: str, metadata: DataMetadata) -> Optional[str]:
+    """Dtype every stored value of a column has, if the dataset was coerced at ingest"""
+    # Older uploads recorded dtypes before blanking nulls to "", so their
+    # numeric columns can still hold strings
+    return metadata.dtypes.get(col) if metadata.coerced else None
+
+
+def numeric_field(col: str, dtype: Optional[str] = None) -> Any:
+    """Coerce a row value to double the way pd.to_numeric(errors="coerce") does"""
+    if dtype in NUMERIC_DTYPES:
+        # Typed at ingest, so there is nothing to convert
+        return field_path(col)
+    return {
+        "$convert": {
+            "input": field_path(col),
+            "to": "double",
+            "onError": None,
+            "onNull": None,
+        }
+    }
+
+
+def date_bucket(
+    col: str, granularity: str, dtype: Optional[str] = None
+) -> Dict[str, Any]:
+    """Truncate a row value to its time bucket; non-dates become null"""
+    if dtype and dtype.startswith("datetime64"):
+        date = field_path(col)
+    else:
+        date = {
+            "$convert": {
+                "input": field_path(col),
+                "to": "date",
+                "onError": None,
+                "onNull": None,
+            }
+        }
+    truncate = {"date": date, "unit": granularity}
+    if granularity == TimeGranularity.WEEK:
+        truncate["startOfWeek"] = "monday"
+    return {"$dateTrunc": truncate}
+
+
+def x_key(col: str, granularity: Optional[str], metadata: DataMetadata) -> Any:
+    if granularity:
+        return date_bucket(col, granularity, native_dtype(col, metadata))
+    return field_path(col)
+
+
+def non_null_count(col: str) -> Dict[str, Any]:
+    """Count rows with a value, like pandas' groupby count"""
+    return {
+        "$sum": {"$cond": [{"$eq": [{"$ifNull": [field_path(col), None]}, None]}, 0, 1]}
+    }
+
+
+def group_accumulator(
+    col: str, aggregation: Optional[str], metadata: DataMetadata
+) -> Dict[str, Any]:
+    if aggregation == AggregationType.COUNT:
+        return non_null_count(col)
+    operator = GROUP_OPERATORS.get(aggregation, "$sum")
+    return {operator: numeric_field(col, native_dtype(col, metadata))}
+
+
+def drop_null_keys(*cols: str) -> Dict[str, Any]:
+    """Leave out rows without a group key, as pandas' groupby does"""
+    return {"$match": {f"row_data.{col}": {"$ne": None} for col in cols}}
+
+
+def is_pushdown_column(col: str, metadata: DataMetadata) -> bool:
+    return col in metadata.columns and "." not in col and not col.startswith("$")
+
+
+def top_n_stages(top_n: int) -> List[Dict[str, Any]]:
+    """Keep the top_n largest groups plus the totals needed to build the Other group"""
+    # $sort followed by $limit runs as a top-k selection instead of a full sort.
+    # One extra group is kept because it is the largest of the rest (MAX).
+    return [
+        {
+            "$facet": {
+                "top": [{"$sort": {"value": -1, "_id": 1}}, {"$limit": top_n + 1}],
+                "totals": [
+                    {
+                        "$group": {
+                            "_id": None,
+                            "groups": {"$sum": 1},
+                            "value": {"$sum": "$value"},
+                            "sum": {"$sum": "$sum"},
+                            "count": {"$sum": "$count"},
+                            "min": {"$min": "$value"},
+                        }
+                    }
+                ],
+            }
+        }
+    ]
+
+
+def fold_top_n(
+    results: List[Dict[str, Any]], aggregation: Optional[str], top_n: int
+) -> List[Dict[str, Any]]:
+    """Turn top_n_stages output into groups followed by a flagged Other group"""
+    facet = results[0] if results else {"top": [], "totals": []}
+    top = facet["top"][:top_n]
+    if not facet["totals"] or facet["totals"][0]["groups"] <= top_n:
+        return top
+
+    totals = facet["totals"][0]
+    if aggregation == AggregationType.AVG:
+        rest_count = totals["count"] - sum(doc["count"] for doc in top)
+        rest_sum = totals["sum"] - sum(doc["sum"] for doc in top)
+        other = rest_sum / rest_count if rest_count else None
+    elif aggregation == AggregationType.MAX:
+        other = facet["top"][top_n]["value"]
+    elif aggregation == AggregationType.MIN:
+        other = totals["min"]
+    else:
+        other = totals["value"] - sum(doc["value"] or 0 for doc in top)
+    return top + [{"_id": OTHER_LABEL, "value": other, "other": True}]
+
+
+def compile_match(
+    metadata: DataMetadata, filters: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Build the $match stage for a widget's filters"""
+    return {"$match": {"data_id": metadata.id, **compile_filters(filters, metadata)}}
+
+
+def compile_widget_pipeline(
+    metadata: DataMetadata,
+    columns: List[str],
+    aggregation: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    granularity: Optional[str] = None,
+    top_n: Optional[int] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """Compile a widget spec into an aggregation pipeline, or None if unsupported"""
+    if not columns or not all(is_pushdown_column(col, metadata) for col in columns):
+        return None
+
+    # Filters on columns the dataset doesn't have are ignored, like in pandas
+    filters = {
+        col: value
+        for col, value in (filters or {}).items()
+        if is_pushdown_column(col, metadata)
+    }
+    pipeline = [compile_match(metadata, filters)]
+
+    if aggregation is None:
+        pipeline.append({"$limit": TABLE_ROW_LIMIT})
+        pipeline.append(
+            {"$project": {"_id": 0, **{f"row_data.{col}": 1 for col in columns}}}
+        )
+        return pipeline
+
+    if len(columns) == 1:
+        col = columns[0]
+        if aggregation == AggregationType.COUNT:
+            if metadata.dtypes.get(col) in ("object", "category"):
+                pipeline.append(drop_null_keys(col))
+                pipeline.append(
+                    {"$group": {"_id": field_path(col), "value": {"$sum": 1}}}
+                )
+                if top_n:
+                    pipeline.extend(top_n_stages(top_n))
+                else:
+                    pipeline.append({"$sort": {"value": -1}})
+            else:
+                pipeline.append({"$count": "value"})
+        else:
+            pipeline.append(
+                {
+                    "$group": {
+                        "_id": None,
+                        "value": group_accumulator(col, aggregation, metadata),
+                    }
+                }
+            )
+        return pipeline
+
+    if len(columns) == 2:
+        x_col, y_col = columns
+        y_field = numeric_field(y_col, native_dtype(y_col, metadata))
+        group = {
+            "_id": x_key(x_col, granularity, metadata),
+            "value": group_accumulator(y_col, aggregation, metadata),
+        }
+        if top_n and aggregation == AggregationType.AVG:
+            # "Other" averages the remaining rows, not the remaining averages
+            group["sum"] = {"$sum": y_field}
+            group["count"] = {
+                "$sum": {"$cond": [{"$eq": [{"$ifNull": [y_field, None]}, None]}, 0, 1]}
+            }
+        pipeline.append(drop_null_keys(x_col))
+        pipeline.append({"$group": group})
+        if granularity:
+            # pandas drops rows whose date can't be parsed
+            pipeline.append({"$match": {"_id": {"$ne": None}}})
+        if top_n:
+            pipeline.extend(top_n_stages(top_n))
+        else:
+            pipeline.append({"$sort": {"_id": 1}})
+        return pipeline
+
+    if len(columns) == 3:
+        x_col, group_col, y_col = columns
+        if aggregation not in (
+            AggregationType.SUM,
+            AggregationType.AVG,
+            AggregationType.COUNT,
+        ):
+            aggregation = AggregationType.SUM
+        pipeline.append(drop_null_keys(x_col, group_col))
+        pipeline.append(
+            {
+                "$group": {
+                    "_id": {
+                        "x": x_key(x_col, granularity, metadata),
+                        "group": field_path(group_col),
+                    },
+                    "value": group_accumulator(y_col, aggregation, metadata),
+                }
+            }
+        )
+        if granularity:
+            pipeline.append({"$match": {"_id.x": {"$ne": None}}})
+        return pipeline
+
+    return None
+
+
+def mark_other(
+    payload: Dict[str, Any], results: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Flag the folded Other entry, which a real "Other" label can't be told from"""
+    if results and results[-1].get("other"):
+        payload["is_other"] = [bool(doc.get("other")) for doc in results]
+    return payload
+
+
+def round_value(value: Any) -> float:
+    return round(float(value), 2) if value is not None else 0
+
+
+def shape_widget_result(
+    columns: List[str],
+    aggregation: Optional[str],
+    results: List[Dict[str, Any]],
+    metadata: DataMetadata,
+) -> Dict[str, Any]:
+    """Turn aggregation results into the payload process_widget_data returns"""
+    if aggregation is None:
+        return {
+            "columns": columns,
+            "rows": [
+                [doc.get("row_data", {}).get(col) for col in columns] for doc in results
+            ],
+        }
+
+    if len(columns) == 1:
+        col = columns[0]
+        if aggregation == AggregationType.COUNT:
+            if metadata.dtypes.get(col) in ("object", "category"):
+                return mark_other(
+                    {
+                        "labels": [doc["_id"] for doc in results],
+                        "data": [doc["value"] for doc in results],
+                    },
+                    results,
+                )
+            return {"value": results[0]["value"] if results else 0, "label": col}
+        value = results[0]["value"] if results else None
+        return {"value": round_value(value), "label": col}
+
+    if len(columns) == 2:
+        return mark_other(
+            {
+                "labels": [doc["_id"] for doc in results],
+                "data": [round_value(doc["value"]) for doc in results],
+            },
+            results,
+        )
+
+    x_col, group_col, y_col = columns
+    result_df = pd.DataFrame(
+        [
+            {
+                x_col: doc["_id"].get("x"),
+                group_col: doc["_id"].get("group"),
+                y_col: doc["value"],
+            }
+            for doc in results
+        ]
+    )
+    if result_df.empty:
+        return {"labels": [], "datasets": []}
+    pivot = result_df.pivot(index=x_col, columns=group_col, values=y_col)
+    return {
+        "labels": pivot.index.tolist(),
+        "datasets": [
+            {
+                "label": str(col),
+                "data": [
+                    round(float(v), 2) if pd.notna(v) else 0 for v in pivot[col].values
+                ],
+            }
+            for col in pivot.columns
+        ],
+    }
+
+
+def aggregate_widget_data(
+    metadata: DataMetadata,
+    columns: List[str],
+    aggregation: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    granularity: Optional[str] = None,
+    top_n: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """Compute a widget in MongoDB, or None if it must fall back to pandas"""
+    pipeline = compile_widget_pipeline(
+        metadata, columns, aggregation, filters, granularity, top_n
+    )
+    if pipeline is None:
+        return None
+
+    db = get_database()
+    data_documents = db.data_documents
+
+    try:
+        results = list(data_documents.aggregate(pipeline))
+    except OperationFailure:
+        return None
+    if "$facet" in pipeline[-1]:
+        results = fold_top_n(results, aggregation, top_n)
+    return shape_widget_result(columns, aggregation, results, metadata)
+
+
+# Aggregations whose per-group partials combine across disjoint sets of rows
+MERGEABLE_AGGREGATIONS = (
+    AggregationType.SUM,
+    AggregationType.AVG,
+    AggregationType.MIN,
+    AggregationType.MAX,
+    AggregationType.COUNT,
+)
+
+
+def is_mergeable_widget(
+    metadata: DataMetadata,
+    columns: List[str],
+    aggregation: Optional[str],
+    top_n: Optional[int] = None,
+) -> bool:
+    """Whether a widget's payload can be rebuilt from partials of disjoint row sets"""
+    if aggregation not in MERGEABLE_AGGREGATIONS or top_n:
+        return False
+    if len(columns) not in (1, 2):
+        return False
+    if not all(is_pushdown_column(col, metadata) for col in columns):
+        return False
+    # Value counts are ordered by count, with ties left to the server
+    if len(columns) == 1 and aggregation == AggregationType.COUNT:
+        return metadata.dtypes.get(columns[0]) not in ("object", "category")
+    return True
+
+
+def compile_partial_pipeline(
+    metadata: DataMetadata,
+    columns: List[str],
+    filters: Optional[Dict[str, Any]],
+    granularity: Optional[str],
+    rows: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    """Pipeline computing the sum, counts, min and max of a mergeable widget's groups"""
+    filters = {
+        col: value
+        for col, value in (filters or {}).items()
+        if is_pushdown_column(col, metadata)
+    }
+    y_col = columns[-1]
+    y_field = numeric_field(y_col, native_dtype(y_col, metadata))
+    group = {
+        "sum": {"$sum": y_field},
+        "count": {
+            "$sum": {"$cond": [{"$eq": [{"$ifNull": [y_field, None]}, None]}, 0, 1]}
+        },
+        "min": {"$min": y_field},
+        "max": {"$max": y_field},
+    }
+    pipeline = [compile_match(metadata, filters), {"$match": rows}]
+    if len(columns) == 1:
+        pipeline.append({"$group": {"_id": None, "rows": {"$sum": 1}, **group}})
+        return pipeline
+
+    x_col = columns[0]
+    pipeline.append(drop_null_keys(x_col))
+    pipeline.append(
+        {
+            "$group": {
+                "_id": x_key(x_col, granularity, metadata),
+                "rows": non_null_count(y_col),
+                **group,
+            }
+        }
+    )
+    if granularity:
+        pipeline.append({"$match": {"_id": {"$ne": None}}})
+    return pipeline
+
+
+def aggregate_partials(
+    metadata: DataMetadata,
+    columns: List[str],
+    filters: Optional[Dict[str, Any]],
+    granularity: Optional[str],
+    rows: Dict[str, Any],
+) -> Optional[List[Dict[str, Any]]]:
+    """Partials of a mergeable widget over the rows matching rows, or None on failure"""
+    db = get_database()
+    data_documents = db.data_documents
+
+    pipeline = compile_partial_pipeline(metadata, columns, filters, granularity, rows)
+    try:
+        return list(data_documents.aggregate(pipeline))
+    except OperationFailure:
+        return None
+
+
+def merge_partials(
+    a: List[Dict[str, Any]], b: List[Dict[str, Any]]
+) -> Optional[List[Dict[str, Any]]]:
+    """Combine the partials of two disjoint row sets, sorted by group key"""
+    merged = {}
+    for doc in a + b:
+        # True and 1 are different groups to MongoDB but equal dict keys
+        key = (isinstance(doc["_id"], bool), doc["_id"])
+        if key not in merged:
+            merged[key] = dict(doc)
+            continue
+        total = merged[key]
+        for field in ("rows", "sum", "count"):
+            total[field] += doc[field]
+        for field, pick in (("min", min), ("max", max)):
+            values = [v for v in (total[field], doc[field]) if v is not None]
+            total[field] = pick(values) if values else None
+    try:
+        return sorted(merged.values(), key=lambda doc: doc["_id"])
+    except TypeError:
+        # Keys of mixed types sort in BSON order, which is left to the server
+        return None
+
+
+def render_partials(
+    columns: List[str], aggregation: str, partials: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Turn merged partials into the payload aggregate_widget_data returns"""
+
+    def value(doc: Dict[str, Any]) -> Any:
+        if aggregation == AggregationType.COUNT:
+            return doc["rows"]
+        if aggregation == AggregationType.AVG:
+            return doc["sum"] / doc["count"] if doc["count"] else None
+        if aggregation == AggregationType.MIN:
+            return doc["min"]
+        if aggregation == AggregationType.MAX:
+            return doc["max"]
+        return doc["sum"]
+
+    if len(columns) == 1:
+        col = columns[0]
+        if aggregation == AggregationType.COUNT:
+            return {"value": partials[0]["rows"] if partials else 0, "label": col}
+        return {
+            "value": round_value(value(partials[0]) if partials else None),
+            "label": col,
+        }
+
+    return {
+        "labels": [doc["_id"] for doc in partials],
+        "data": [round_value(value(doc)) for doc in partials],
+    }
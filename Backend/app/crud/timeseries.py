@@ -0,0 +1,97 @@
+import math
+from typing import Optional, Dict, Any
+from app.models.models import TimeGranularity
+import numpy as np
+import pandas as pd
+
+# Period frequencies matching $dateTrunc units; weeks start on Monday
+GRANULARITY_FREQUENCIES = {
+    TimeGranularity.HOUR: "h",
+    TimeGranularity.DAY: "D",
+    TimeGranularity.WEEK: "W-SUN",
+    TimeGranularity.MONTH: "M",
+    TimeGranularity.QUARTER: "Q",
+    TimeGranularity.YEAR: "Y",
+}
+
+
+def bucket_dates(series: pd.Series, granularity: str) -> pd.Series:
+    """Truncate dates to the start of their bucket; non-dates become NaT"""
+    dates = pd.to_datetime(series, errors="coerce")
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+    return dates.dt.to_period(GRANULARITY_FREQUENCIES[granularity]).dt.start_time
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of threshold points keeping the shape"""
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1])
+
+    every = (n - 2) / (threshold - 2)
+    sampled = np.empty(threshold, dtype=int)
+    sampled[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third vertex of the triangle
+        avg_start = math.floor((i + 1) * every) + 1
+        avg_end = min(math.floor((i + 2) * every) + 1, n)
+        avg_x = x[avg_start:avg_end].mean()
+        avg_y = y[avg_start:avg_end].mean()
+
+        start = math.floor(i * every) + 1
+        end = math.floor((i + 1) * every) + 1
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(areas.argmax())
+        sampled[i + 1] = a
+    sampled[-1] = n - 1
+    return sampled
+
+
+def _label_positions(labels: list) -> np.ndarray:
+    # Time axes keep their real spacing; anything else is evenly spaced
+    dates = pd.to_datetime(pd.Series(labels, dtype=object), errors="coerce")
+    if len(labels) and dates.notna().all():
+        return dates.astype("int64").to_numpy(dtype=float)
+    return np.arange(len(labels), dtype=float)
+
+
+def downsample_payload(
+    payload: Dict[str, Any], max_points: Optional[int]
+) -> Dict[str, Any]:
+    """Cap a series payload at max_points with LTTB, leaving other payloads alone"""
+    labels = payload.get("labels")
+    if not max_points or labels is None or len(labels) <= max_points:
+        return payload
+
+    if "datasets" in payload:
+        # One shared set of points keeps every series aligned to the labels
+        values = np.nansum(
+            [np.asarray(ds["data"], dtype=float) for ds in payload["datasets"]],
+            axis=0,
+        )
+    else:
+        try:
+            values = np.asarray(payload["data"], dtype=float)
+        except (TypeError, ValueError):
+            values = np.zeros(len(labels))
+    values = np.nan_to_num(values)
+
+    indices = lttb_indices(_label_positions(labels), values, max_points)
+    downsampled = {**payload, "labels": [labels[i] for i in indices]}
+    if "datasets" in payload:
+        downsampled["datasets"] = [
+            {**ds, "data": [ds["data"][i] for i in indices]}
+            for ds in payload["datasets"]
+        ]
+    else:
+        downsampled["data"] = [payload["data"][i] for i in indices]
+    if "is_other" in payload:
+        downsampled["is_other"] = [payload["is_other"][i] for i in indices]
+    return downsampled
@@ -1,10 +1,18 @@
 from typing import Optional
 from app.models.models import UserCreate, UserInDB
 from app.models.mongo import get_users_collection
-from app.auth.security import get_password_hash
+from app.auth.security import get_password_hash, password_needs_rehash
+from app.core.cache import LRUCache
+from app.settings import settings
 from datetime import datetime, timezone
 from bson import ObjectId
 
+# Authenticated users by username, so token checks skip the Mongo round trip
+user_cache = LRUCache(
+    max_entries=settings.USER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+)
+
 
 def get_user_by_username(username: str) -> Optional[UserInDB]:
     users = get_users_collection()
@@ -15,6 +23,20 @@ def get_user_by_username(username: str) -> Optional[UserInDB]:
     return None
 
 
+def get_cached_user(username: str) -> Optional[UserInDB]:
+    """Get a user from the in-process cache without touching the database"""
+    return user_cache.get(username)
+
+
+def cache_user(user: UserInDB) -> None:
+    user_cache.set(user.username, user)
+
+
+def invalidate_user_cache(username: str) -> None:
+    """Drop a cached user after it changes"""
+    user_cache.invalidate(lambda key: key == username)
+
+
 def get_user_by_email(email: str) -> Optional[UserInDB]:
     users = get_users_collection()
     user_data = users.find_one({"email": email})
@@ -35,10 +57,24 @@ def create_user(user: UserCreate) -> UserInDB:
         "updated_at": datetime.now(timezone.utc),
     }
     result = users.insert_one(user_dict)
+    invalidate_user_cache(user.username)
     user_dict["_id"] = str(result.inserted_id)
     return UserInDB(**user_dict)
 
 
+def update_user_password(user_id: str, hashed_password: str) -> None:
+    users = get_users_collection()
+    users.update_one(
+        {"_id": ObjectId(user_id)},
+        {
+            "$set": {
+                "hashed_password": hashed_password,
+                "updated_at": datetime.now(timezone.utc),
+            }
+        },
+    )
+
+
 def authenticate_user(username: str, password: str):
     from app.auth.security import verify_password
 
@@ -47,4 +83,9 @@ def authenticate_user(username: str, password: str):
         return False
     if not verify_password(password, user.hashed_password):
         return False
+    if password_needs_rehash(user.hashed_password):
+        # The cost setting changed; upgrade the hash while we have the password
+        user.hashed_password = get_password_hash(password)
+        update_user_password(user.id, user.hashed_password)
+        invalidate_user_cache(user.username)
     return user
@@ -1,20 +1,43 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 
-from app.api import auth, data, templates, dashboards
+from app.api import auth, data, templates, dashboards, metrics
 from app.models.mongo import get_database, close_database
+from app.models.indexes import check_index_coverage
+from app.core.workers import (
+    resume_ingest_jobs,
+    shutdown_ingest_executor,
+    sweep_ingest_jobs,
+)
+from app.settings import settings
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     try:
-        get_database()
+        db = get_database()
+        if settings.INDEX_COVERAGE_CHECK:
+            for entry in check_index_coverage(db):
+                if not entry["indexed"] or entry["in_memory_sort"]:
+                    print(
+                        f"Startup Warning: {entry['collection']} query on "
+                        f"{entry['filter']} is not covered by an index"
+                    )
+        resumed = resume_ingest_jobs()
+        if resumed:
+            print(f"Resumed {resumed} interrupted ingestion jobs.")
     except Exception as e:
         print(f"Startup Warning: Database connection failed: {e}")
+    # Jobs of workers that die while this process keeps running are picked up
+    # here rather than only at the next restart
+    sweeper = asyncio.create_task(sweep_ingest_jobs())
     yield
     # Shutdown
+    sweeper.cancel()
+    shutdown_ingest_executor()
     close_database()
 
 
@@ -26,12 +49,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 app.include_router(auth.router, prefix="/api")
 app.include_router(data.router, prefix="/api")
 app.include_router(templates.router, prefix="/api")
 app.include_router(dashboards.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
 
 
 @app.get("/")
@@ -0,0 +1,205 @@
+from typing import Any, Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.database import Database
+
+# Each migration drops and then creates indexes and is applied once, in order.
+# Never edit a released migration; append a new version instead.
+INDEX_MIGRATIONS: List[Dict[str, Any]] = [
+    {
+        "version": 1,
+        "create": {
+            "users": [
+                IndexModel([("username", ASCENDING)], name="username_1", unique=True),
+                IndexModel([("email", ASCENDING)], name="email_1", unique=True),
+            ],
+            "data_documents": [
+                IndexModel(
+                    [("data_id", ASCENDING), ("_id", ASCENDING)], name="data_id_1__id_1"
+                ),
+            ],
+            "data_columns": [
+                IndexModel(
+                    [
+                        ("data_id", ASCENDING),
+                        ("column", ASCENDING),
+                        ("chunk", ASCENDING),
+                    ],
+                    name="data_id_1_column_1_chunk_1",
+                ),
+            ],
+            "data_metadata": [
+                IndexModel(
+                    [("user_id", ASCENDING), ("created_at", DESCENDING)],
+                    name="user_id_1_created_at_-1",
+                ),
+            ],
+            "data_templates": [
+                IndexModel(
+                    [("user_id", ASCENDING), ("created_at", DESCENDING)],
+                    name="user_id_1_created_at_-1",
+                ),
+            ],
+            "dashboards": [
+                IndexModel(
+                    [("user_id", ASCENDING), ("created_at", DESCENDING)],
+                    name="user_id_1_created_at_-1",
+                ),
+                IndexModel([("data_id", ASCENDING)], name="data_id_1"),
+            ],
+        },
+    },
+    {
+        "version": 2,
+        "create": {
+            "ingest_jobs": [
+                IndexModel(
+                    [("status", ASCENDING), ("updated_at", ASCENDING)],
+                    name="status_1_updated_at_1",
+                ),
+            ],
+        },
+    },
+    {
+        # List endpoints page by (created_at, _id) keyset cursors
+        "version": 3,
+        "drop": {
+            "data_metadata": ["user_id_1_created_at_-1"],
+            "data_templates": ["user_id_1_created_at_-1"],
+            "dashboards": ["user_id_1_created_at_-1"],
+        },
+        "create": {
+            collection: [
+                IndexModel(
+                    [
+                        ("user_id", ASCENDING),
+                        ("created_at", DESCENDING),
+                        ("_id", DESCENDING),
+                    ],
+                    name="user_id_1_created_at_-1__id_-1",
+                ),
+            ]
+            for collection in ("data_metadata", "data_templates", "dashboards")
+        },
+    },
+    {
+        # Two blocks of one column can never share a chunk number
+        "version": 4,
+        "drop": {"data_columns": ["data_id_1_column_1_chunk_1"]},
+        "create": {
+            "data_columns": [
+                IndexModel(
+                    [
+                        ("data_id", ASCENDING),
+                        ("column", ASCENDING),
+                        ("chunk", ASCENDING),
+                    ],
+                    name="data_id_1_column_1_chunk_1",
+                    unique=True,
+                ),
+            ],
+        },
+    },
+    {
+        # Appended rows are read and deleted per append job; rows of the
+        # original upload have no ingest_id and stay out of the index
+        "version": 5,
+        "create": {
+            "data_documents": [
+                IndexModel(
+                    [("data_id", ASCENDING), ("ingest_id", ASCENDING)],
+                    name="data_id_1_ingest_id_1",
+                    partialFilterExpression={"ingest_id": {"$exists": True}},
+                ),
+            ],
+        },
+    },
+]
+
+# Queries the API runs on hot paths, checked by check_index_coverage
+HOT_QUERIES: List[Dict[str, Any]] = [
+    {"collection": "users", "filter": {"username": ""}},
+    {"collection": "users", "filter": {"email": ""}},
+    {"collection": "data_documents", "filter": {"data_id": ""}},
+    {"collection": "data_documents", "filter": {"data_id": "", "ingest_id": ""}},
+    {"collection": "data_columns", "filter": {"data_id": "", "column": {"$in": []}}},
+    *[
+        {
+            "collection": collection,
+            "filter": {"user_id": ""},
+            "sort": [("created_at", DESCENDING), ("_id", DESCENDING)],
+        }
+        for collection in ("data_metadata", "data_templates", "dashboards")
+    ],
+]
+
+
+def get_index_version(db: Database) -> int:
+    doc = db.schema_versions.find_one({"_id": "indexes"})
+    return doc["version"] if doc else 0
+
+
+def ensure_indexes(db: Database) -> int:
+    """Apply pending index migrations and return the resulting version"""
+    current = get_index_version(db)
+    for migration in INDEX_MIGRATIONS:
+        if migration["version"] <= current:
+            continue
+
+        for collection, names in migration.get("drop", {}).items():
+            existing = db[collection].index_information()
+            for name in names:
+                if name in existing:
+                    db[collection].drop_index(name)
+
+        for collection, indexes in migration.get("create", {}).items():
+            db[collection].create_indexes(indexes)
+
+        current = migration["version"]
+        db.schema_versions.update_one(
+            {"_id": "indexes"}, {"$set": {"version": current}}, upsert=True
+        )
+        print(f"Applied index migration {current}.")
+    return current
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = [plan.get("stage", "")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+def check_index_coverage(db: Database) -> List[Dict[str, Any]]:
+    """Explain every hot query and report the ones that scan a whole collection"""
+    report = []
+    for query in HOT_QUERIES:
+        cursor = db[query["collection"]].find(query["filter"])
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        stages = _plan_stages(plan)
+        report.append(
+            {
+                "collection": query["collection"],
+                "filter": list(query["filter"].keys()),
+                "sort": [field for field, _ in query.get("sort", [])],
+                "indexed": "COLLSCAN" not in stages,
+                "in_memory_sort": "SORT" in stages,
+                "stages": stages,
+            }
+        )
+    return report
+
+
+if __name__ == "__main__":
+    from app.models.mongo import get_database
+
+    for entry in check_index_coverage(get_database()):
+        status = "ok" if entry["indexed"] and not entry["in_memory_sort"] else "MISSING"
+        print(
+            f"{status:8} {entry['collection']}: filter={entry['filter']} "
+            f"sort={entry['sort']} plan={' > '.join(entry['stages'])}"
+        )
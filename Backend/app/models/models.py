@@ -35,6 +35,22 @@ class AggregationType(str, Enum):
     MAX = "max"
 
 
+class TimeGranularity(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+    QUARTER = "quarter"
+    YEAR = "year"
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
 # User models
 class UserInDB(BaseModel):
     id: Optional[str] = Field(None, alias="_id")
@@ -79,11 +95,17 @@ class TokenData(BaseModel):
 class DataMetadata(BaseModel):
     id: Optional[str] = Field(None, alias="_id")
     user_id: str
+    template_id: Optional[str] = None
     name: str = Field(..., min_length=1, max_length=100)
     columns: list[str]
     dtypes: dict[str, str]
     num_rows: int = Field(..., ge=0)
     source_type: SourceType
+    append_ids: list[str] = []
+    # Rows were converted to the template's column types when stored
+    coerced: bool = False
+    # Chunk number the next column block gets; None for datasets stored before it
+    next_chunk: Optional[int] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -117,6 +139,32 @@ class DataDocument(BaseModel):
         populate_by_name = True
 
 
+class IngestJob(BaseModel):
+    id: Optional[str] = Field(None, alias="_id")
+    user_id: str
+    template_id: str
+    filename: str
+    file_path: str
+    source_type: SourceType
+    status: JobStatus = JobStatus.QUEUED
+    data_id: Optional[str] = None
+    append: bool = False
+    rows_processed: int = 0
+    rows_per_second: float = 0
+    invalid_count: int = 0
+    invalid_values: list[dict[str, Any]] = []
+    error: Optional[str] = None
+    attempts: int = 0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Config:
+        populate_by_name = True
+        use_enum_values = True
+
+
 class VisualizationWidget(BaseModel):
     position: int = Field(..., ge=1, le=6)
     chart_type: ChartType
@@ -124,6 +172,9 @@ class VisualizationWidget(BaseModel):
     columns: list[str]
     aggregation: Optional[AggregationType] = None
     filters: Optional[dict[str, Any]] = None
+    granularity: Optional[TimeGranularity] = None
+    max_points: Optional[int] = Field(None, ge=2)
+    top_n: Optional[int] = Field(None, ge=1)
 
 
 class DashboardConfig(BaseModel):
@@ -134,6 +185,7 @@ class DashboardConfig(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     layout_type: str = "default_6"
     widgets: list[VisualizationWidget]
+    materialized: bool = False
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
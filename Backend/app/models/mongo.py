@@ -1,26 +1,150 @@
+import os
+import threading
+from typing import Any, Dict
 from pymongo import MongoClient
+from pymongo import monitoring
 from app.settings import settings
+from app.models.indexes import ensure_indexes
 
 client = None
 db = None
+# Process that created the client; a forked worker must not reuse its parent's
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Connection pool counters: connections in use, waiters and checkout wait time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.open = 0
+            self.in_use = 0
+            self.waiting = 0
+            self.checkouts = 0
+            self.failed_checkouts = 0
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.pool_clears = 0
+
+    def _checkout_done(self, duration: float) -> None:
+        self.waiting -= 1
+        self.wait_seconds += duration or 0.0
+        self.max_wait_seconds = max(self.max_wait_seconds, duration or 0.0)
+
+    def connection_check_out_started(self, event) -> None:
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event) -> None:
+        with self._lock:
+            self._checkout_done(event.duration)
+            self.checkouts += 1
+            self.in_use += 1
+
+    def connection_check_out_failed(self, event) -> None:
+        with self._lock:
+            self._checkout_done(event.duration)
+            self.failed_checkouts += 1
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self.open -= 1
+
+    def pool_cleared(self, event) -> None:
+        with self._lock:
+            self.pool_clears += 1
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self.checkouts + self.failed_checkouts
+            return {
+                "max_pool_size": settings.MONGO_MAX_POOL_SIZE,
+                "open": self.open,
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "failed_checkouts": self.failed_checkouts,
+                "pool_clears": self.pool_clears,
+                "avg_wait_ms": (
+                    round(self.wait_seconds / completed * 1000, 2) if completed else 0
+                ),
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+            }
+
+
+pool_monitor = PoolMonitor()
+
+
+def client_options() -> Dict[str, Any]:
+    """MongoClient keyword arguments from the MONGO_* settings"""
+    options = {
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "event_listeners": [pool_monitor],
+    }
+    if settings.MONGO_MAX_IDLE_TIME_MS is not None:
+        options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if settings.MONGO_COMPRESSORS:
+        options["compressors"] = settings.MONGO_COMPRESSORS
+    return options
 
 
 def get_database():
-    global client, db
-    if client is None:
+    global client, db, _client_pid
+    if db is not None and _client_pid == os.getpid():
+        return db
+
+    with _client_lock:
+        if db is not None and _client_pid == os.getpid():
+            return db
+        # A client inherited through fork shares its parent's sockets, so the
+        # child drops it without closing and opens its own
+        client = db = None
+        pool_monitor.reset()
+        new_client = None
         try:
             print(f"Connecting to MongoDB at {settings.mongo_uri}...")
-            client = MongoClient(settings.mongo_uri, serverSelectionTimeoutMS=5000)
-            db = client[settings.MONGO_DB]
+            new_client = MongoClient(settings.mongo_uri, **client_options())
+            new_db = new_client[settings.MONGO_DB]
             # Verify connection
-            client.admin.command("ping")
+            new_client.admin.command("ping")
             print("Successfully connected to MongoDB.")
 
-            db.users.create_index("username", unique=True)
-            db.users.create_index("email", unique=True)
+            ensure_indexes(new_db)
         except Exception as e:
             print(f"CRITICAL: Could not connect to MongoDB: {e}")
+            if new_client is not None:
+                new_client.close()
             raise e
+        client, db, _client_pid = new_client, new_db, os.getpid()
     return db
 
 
@@ -30,6 +154,8 @@ def get_users_collection():
 
 
 def close_database():
-    global client
-    if client:
-        client.close()
+    global client, db, _client_pid
+    with _client_lock:
+        if client and _client_pid == os.getpid():
+            client.close()
+        client = db = _client_pid = None
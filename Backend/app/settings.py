@@ -5,6 +5,9 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str = "your_jwt_secret_key_change_this_in_production"
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    BCRYPT_ROUNDS: int = 12
+    USER_CACHE_MAX_ENTRIES: int = 1024
+    USER_CACHE_TTL_SECONDS: int = 60
 
     MONGO_HOST: str = "localhost"
     MONGO_PORT: int = 27017
@@ -12,6 +15,43 @@ class Settings(BaseSettings):
     MONGO_INITDB_ROOT_PASSWORD: str = "password"
     MONGO_DB: str = "keepdm_db"
     MONGO_URL: str | None = None
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int | None = None
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int | None = None
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_COMPRESSORS: str = ""
+    INDEX_COVERAGE_CHECK: bool = False
+
+    PAGE_DEFAULT_LIMIT: int = 50
+    PAGE_MAX_LIMIT: int = 200
+    ROWS_MAX_LIMIT: int = 1000
+    EXPORT_BATCH_ROWS: int = 5000
+
+    DATASET_CHUNK_ROWS: int = 10000
+    DATASET_CHUNK_MAX_BYTES: int = 8 * 1024 * 1024
+    PROFILE_DISTINCT_CAP: int = 1000
+    PROFILE_DISTINCT_MAX_BYTES: int = 64 * 1024
+    WIDGET_PUSHDOWN: bool = True
+    WIDGET_MAX_POINTS: int = 1000
+    WIDGET_CACHE_MAX_ENTRIES: int = 1024
+    WIDGET_CACHE_TTL_SECONDS: int = 600
+    WIDGET_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    SNAPSHOT_REFRESH_TIMEOUT_SECONDS: int = 300
+    WORKBOOK_CACHE_MAX_ENTRIES: int = 256
+    WORKBOOK_CACHE_TTL_SECONDS: int = 3600
+    WORKBOOK_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+
+    DB_THREAD_POOL_SIZE: int = 20
+    CPU_THREAD_POOL_SIZE: int = 4
+    HASH_THREAD_POOL_SIZE: int = 2
+    HASH_QUEUE_LIMIT: int = 32
+
+    INGEST_WORKERS: int = 2
+    INGEST_JOB_STALE_SECONDS: int = 300
+    INGEST_JOB_SWEEP_SECONDS: int = 60
+    INGEST_INVALID_SAMPLE_LIMIT: int = 100
+    UPLOAD_SPOOL_DIR: str = "/tmp/keepdm-uploads"
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,64 @@
+"""Time the column profiling engine on a synthetic dataset.
+
+Builds a frame shaped like stored uploads (object columns with "" for
+missing values) and profiles it the way GET /api/data/{id}/analysis does.
+
+    python -m scripts.benchmark_profile --rows 1000000
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from app.crud.profile import profile_columns
+from app.models.models import DataTemplate
+
+
+def build_frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    sales = pd.Series(rng.random(rows) * 1000, dtype=object)
+    sales[rng.random(rows) < 0.02] = ""
+    return pd.DataFrame(
+        {
+            "sales": sales,
+            "region": rng.choice(["North", "South", "East", "West", ""], rows),
+            "email": [f"user{i % 5000}@example.com" for i in range(rows)],
+            "date": pd.Series(
+                pd.date_range("2020-01-01", periods=rows, freq="min")
+            ).astype(object),
+            "active": rng.choice([True, False], rows),
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    template = DataTemplate(
+        user_id="benchmark",
+        name="benchmark",
+        columns={
+            "sales": "number",
+            "region": "text",
+            "email": "email",
+            "date": "date",
+            "active": "boolean",
+        },
+    )
+    df = build_frame(args.rows)
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        profile_columns(df, template)
+        timings.append(time.perf_counter() - start)
+
+    print(f"{args.rows} rows x {len(template.columns)} columns")
+    print(f"  best {min(timings) * 1000:.1f} ms, worst {max(timings) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Measure request latency while the API is busy with slow requests.
+
+Fires --requests GETs at --path with --concurrency parallel clients while
+--background-concurrency clients keep hitting --background-path (an upload
+analysis, a large dashboard, ...). Run it against the same dataset before
+and after a change to compare how much the slow requests stall the rest.
+
+    python scripts/load_test.py --token $TOKEN --path /api/auth/me \\
+        --background-path /api/data/<data_id>/analysis
+"""
+
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def timed_get(url: str, token: str) -> tuple[float, bool]:
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            response.read()
+            ok = response.status < 400
+    except (urllib.error.URLError, TimeoutError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="Bearer access token")
+    parser.add_argument("--path", default="/api/auth/me")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--background-path", default=None)
+    parser.add_argument("--background-concurrency", type=int, default=2)
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    background_latencies = []
+
+    def background_worker():
+        while not stop.is_set():
+            elapsed, _ = timed_get(args.base_url + args.background_path, args.token)
+            background_latencies.append(elapsed)
+
+    background_threads = []
+    if args.background_path:
+        for _ in range(args.background_concurrency):
+            thread = threading.Thread(target=background_worker, daemon=True)
+            thread.start()
+            background_threads.append(thread)
+        # Let the slow requests get going before measuring
+        time.sleep(0.5)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(
+            pool.map(
+                lambda _: timed_get(args.base_url + args.path, args.token),
+                range(args.requests),
+            )
+        )
+    wall = time.perf_counter() - start
+    stop.set()
+    for thread in background_threads:
+        thread.join()
+
+    latencies = [elapsed * 1000 for elapsed, _ in results]
+    errors = sum(1 for _, ok in results if not ok)
+    print(f"{args.path}: {len(results)} requests, {errors} errors, {wall:.2f}s")
+    print(f"  throughput  {len(results) / wall:.1f} req/s")
+    print(f"  p50         {statistics.median(latencies):.1f} ms")
+    print(f"  p95         {percentile(latencies, 95):.1f} ms")
+    print(f"  p99         {percentile(latencies, 99):.1f} ms")
+    print(f"  max         {max(latencies):.1f} ms")
+    if background_latencies:
+        print(
+            f"{args.background_path}: {len(background_latencies)} completed, "
+            f"mean {statistics.mean(background_latencies) * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
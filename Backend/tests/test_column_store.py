@@ -0,0 +1,27 @@
+import pandas as pd
+from app.crud.column_store import chunk_bounds
+from app.settings import settings
+
+
+def test_chunk_bounds_split_wide_text_by_size(monkeypatch):
+    monkeypatch.setattr(settings, "DATASET_CHUNK_ROWS", 100)
+    monkeypatch.setattr(settings, "DATASET_CHUNK_MAX_BYTES", 1000)
+    df = pd.DataFrame({"id": range(250), "text": ["x" * 84] * 250})
+
+    bounds = list(chunk_bounds(df))
+
+    # 84 characters plus 16 bytes of overhead: ten values per block
+    assert bounds[0] == (0, 10)
+    assert bounds[-1] == (240, 250)
+    assert all(end - start == 10 for start, end in bounds)
+
+
+def test_chunk_bounds_cap_rows_and_keep_oversized_values():
+    df = pd.DataFrame({"id": range(settings.DATASET_CHUNK_ROWS + 1)})
+    assert list(chunk_bounds(df)) == [
+        (0, settings.DATASET_CHUNK_ROWS),
+        (settings.DATASET_CHUNK_ROWS, settings.DATASET_CHUNK_ROWS + 1),
+    ]
+
+    huge = pd.DataFrame({"text": ["x" * (settings.DATASET_CHUNK_MAX_BYTES + 1)] * 2})
+    assert list(chunk_bounds(huge)) == [(0, 1), (1, 2)]
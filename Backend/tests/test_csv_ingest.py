@@ -0,0 +1,23 @@
+import io
+from app.crud.ingest import iter_csv_batches, coerce_batch, to_records
+from app.models.models import DataTemplate
+
+
+def test_csv_text_keeps_leading_zeros_and_literal_null_words():
+    template = DataTemplate(
+        _id="t",
+        user_id="u",
+        name="codes",
+        columns={"code": "text", "phone": "text", "amount": "number"},
+    )
+    csv = io.BytesIO(b"code,phone,amount\n0123,0612345678,1.5\nNA,null,\n007,,x\n")
+
+    batches = list(iter_csv_batches(csv, template, 100))
+    coerced, invalid_count, invalid_values = coerce_batch(batches[0], template, 1, 10)
+    records = to_records(coerced)
+
+    assert [r["code"] for r in records] == ["0123", "NA", "007"]
+    assert [r["phone"] for r in records] == ["0612345678", "null", None]
+    assert [r["amount"] for r in records] == [1.5, None, None]
+    assert invalid_count == 1
+    assert invalid_values[0]["value"] == "x"
@@ -0,0 +1,13 @@
+from urllib.parse import unquote
+from app.core.http import attachment_disposition
+
+
+def test_attachment_disposition_quotes_and_encodes_any_name():
+    name = 'Ventas; "Q1" año.csv'
+
+    header = attachment_disposition(name)
+
+    fallback, encoded = header.split("; filename*=UTF-8''")
+    assert fallback == 'attachment; filename="Ventas; _Q1_ a_o.csv"'
+    assert unquote(encoded) == name
+    header.encode("latin-1")
@@ -0,0 +1,66 @@
+import pandas as pd
+from app.crud.data import restore_dtypes
+from app.crud.pipeline import compile_widget_pipeline
+from app.models.models import DataMetadata, SourceType
+
+
+def legacy_metadata(**overrides) -> DataMetadata:
+    # Uploads from before ingest coercion recorded dtypes before blanking nulls
+    fields = {
+        "_id": "legacy",
+        "user_id": "user",
+        "name": "legacy.xlsx",
+        "columns": ["region", "sales", "date"],
+        "dtypes": {
+            "region": "object",
+            "sales": "float64",
+            "date": "datetime64[ns]",
+        },
+        "num_rows": 3,
+        "source_type": SourceType.EXCEL,
+    }
+    fields.update(overrides)
+    return DataMetadata(**fields)
+
+
+def test_restore_dtypes_loads_legacy_blank_cells_as_nulls():
+    df = pd.DataFrame(
+        {
+            "region": ["N", "", "S"],
+            "sales": [1.5, "", 3.0],
+            "date": [pd.Timestamp("2024-01-01"), "", pd.Timestamp("2024-01-03")],
+        }
+    )
+
+    restored = restore_dtypes(df, legacy_metadata())
+
+    assert restored["sales"].dtype == "float64"
+    assert restored["sales"].isna().tolist() == [False, True, False]
+    assert restored["sales"].sum() == 4.5
+    assert pd.api.types.is_datetime64_any_dtype(restored["date"])
+    assert restored["date"].isna().tolist() == [False, True, False]
+    assert restored["region"].tolist() == ["N", "", "S"]
+
+
+def test_legacy_pipeline_converts_numeric_columns():
+    pipeline = compile_widget_pipeline(legacy_metadata(), ["region", "sales"], "max")
+
+    group = next(stage["$group"] for stage in pipeline if "$group" in stage)
+    assert group["value"] == {
+        "$max": {
+            "$convert": {
+                "input": "$row_data.sales",
+                "to": "double",
+                "onError": None,
+                "onNull": None,
+            }
+        }
+    }
+
+
+def test_coerced_pipeline_reads_native_numbers():
+    metadata = legacy_metadata(coerced=True)
+    pipeline = compile_widget_pipeline(metadata, ["region", "sales"], "max")
+
+    group = next(stage["$group"] for stage in pipeline if "$group" in stage)
+    assert group["value"] == {"$max": "$row_data.sales"}
@@ -0,0 +1,42 @@
+from datetime import datetime
+from app.crud.pipeline import merge_partials, render_partials
+
+
+def partial(key, rows, total, count, low, high):
+    return {
+        "_id": key,
+        "rows": rows,
+        "sum": total,
+        "count": count,
+        "min": low,
+        "max": high,
+    }
+
+
+def test_appended_partials_merge_into_sorted_groups():
+    stored = [partial("a", 2, 3.0, 2, 1.0, 2.0), partial("c", 1, 5.0, 1, 5.0, 5.0)]
+    added = [partial("b", 1, 4.0, 1, 4.0, 4.0), partial("a", 2, 9.0, 1, 9.0, 9.0)]
+
+    merged = merge_partials(stored, added)
+
+    assert [doc["_id"] for doc in merged] == ["a", "b", "c"]
+    assert render_partials(["x", "y"], "avg", merged)["data"] == [4.0, 4.0, 5.0]
+    assert render_partials(["x", "y"], "count", merged)["data"] == [4.0, 1.0, 1.0]
+    assert render_partials(["x", "y"], "min", merged)["data"] == [1.0, 4.0, 5.0]
+    assert render_partials(["y"], "sum", merge_partials([], []))["value"] == 0
+
+
+def test_groups_without_numeric_values_keep_null_extremes():
+    merged = merge_partials(
+        [partial(datetime(2024, 1, 1), 1, 0, 0, None, None)],
+        [partial(datetime(2024, 1, 1), 1, 2.0, 1, 2.0, 2.0)],
+    )
+
+    assert merged[0]["min"] == 2.0 and merged[0]["rows"] == 2
+
+
+def test_keys_that_cannot_be_ordered_fall_back_to_a_full_recompute():
+    assert (
+        merge_partials([partial("a", 1, 1, 1, 1, 1)], [partial(1, 1, 1, 1, 1, 1)])
+        is None
+    )
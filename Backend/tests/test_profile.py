@@ -0,0 +1,44 @@
+import pandas as pd
+from app.crud.profile import column_state, merge_column_states, finalize_column
+from app.settings import settings
+
+
+def text_analysis(state):
+    return finalize_column("name", "text", state)
+
+
+def test_unique_count_is_exact_under_the_distinct_cap():
+    analysis = text_analysis(column_state("text", pd.Series(["a", "b", "a", None])))
+
+    assert analysis["unique_count"] == 2
+    assert analysis["unique_count_is_estimate"] is False
+
+
+def test_unique_count_is_estimated_past_the_distinct_cap():
+    values = pd.Series([f"value-{i}" for i in range(20000)], dtype=object)
+    # Overlapping batches, as appends of repeated rows produce
+    merged = merge_column_states(
+        column_state("text", values[:12000]), column_state("text", values[8000:])
+    )
+
+    analysis = text_analysis(merged)
+    assert analysis["unique_count_is_estimate"] is True
+    assert abs(analysis["unique_count"] - 20000) < 20000 * 0.05
+    assert analysis["is_categorical"] is False
+    assert merged["hll"] == column_state("text", values)["hll"]
+
+
+def test_distinct_values_are_capped_by_bytes(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_DISTINCT_MAX_BYTES", 1000)
+    values = pd.Series([f"{i:04d}" + "x" * 96 for i in range(50)], dtype=object)
+
+    state = column_state("text", values)
+    merged = merge_column_states(
+        column_state("text", values[:30]), column_state("text", values[30:])
+    )
+
+    assert len(state["distinct"]) == 10
+    assert len(merged["distinct"]) == 10
+    analysis = text_analysis(merged)
+    assert analysis["unique_count_is_estimate"] is True
+    assert analysis["unique_count"] == 50
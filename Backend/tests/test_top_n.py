@@ -0,0 +1,49 @@
+import pandas as pd
+from app.crud.dashboard import process_widget_data
+from app.crud.pipeline import fold_top_n, mark_other
+
+
+def test_folded_bucket_is_flagged_apart_from_a_real_other_category():
+    df = pd.DataFrame({"category": ["Other"] * 3 + ["a"] * 2 + ["b", "c"]})
+
+    payload = process_widget_data("d", ["category"], "count", df=df, top_n=2)
+
+    assert payload["labels"] == ["Other", "a", "Other"]
+    assert payload["data"] == [3, 2, 2]
+    assert payload["is_other"] == [False, False, True]
+
+
+def test_unfolded_payload_has_no_flags():
+    df = pd.DataFrame({"category": ["Other", "a"]})
+
+    payload = process_widget_data("d", ["category"], "count", df=df, top_n=2)
+
+    assert "is_other" not in payload
+
+
+def test_pipeline_fold_flags_only_the_synthetic_group():
+    facet = {
+        "top": [
+            {"_id": "Other", "value": 3},
+            {"_id": "a", "value": 2},
+            {"_id": "b", "value": 1},
+        ],
+        "totals": [{"groups": 4, "value": 7}],
+    }
+
+    results = fold_top_n([facet], "count", 2)
+    payload = mark_other({"labels": [doc["_id"] for doc in results]}, results)
+
+    assert payload == {
+        "labels": ["Other", "a", "Other"],
+        "is_other": [False, False, True],
+    }
+
+
+def test_ties_at_the_cut_go_to_the_smaller_label():
+    df = pd.DataFrame({"category": ["d", "c", "b", "a", "a", "z", "z", "z"]})
+
+    payload = process_widget_data("d", ["category"], "count", df=df, top_n=3)
+
+    assert payload["labels"] == ["z", "a", "b", "Other"]
+    assert payload["data"] == [3, 2, 1, 2]
@@ -51,3 +51,17 @@ apiClient.interceptors.response.use(
     return Promise.reject(error)
   }
 )
+
+export interface Page<T> {
+  items: T[]
+  nextCursor?: string
+}
+
+// List endpoints are paginated; X-Next-Cursor points at the following page
+export async function getPage<T>(url: string, cursor?: string, limit?: number): Promise<Page<T>> {
+  const response = await apiClient.get<T[]>(url, { params: { cursor, limit } })
+  return {
+    items: response.data,
+    nextCursor: response.headers['x-next-cursor'] || undefined,
+  }
+}
@@ -1,4 +1,4 @@
-import { apiClient } from '../client'
+import { apiClient, getPage, type Page } from '../client'
 
 export type ChartType = 'kpi' | 'line' | 'bar' | 'area' | 'pie' | 'table'
 export type AggregationType = 'sum' | 'avg' | 'count' | 'min' | 'max'
@@ -20,6 +20,7 @@ export interface Dashboard {
   name: string
   layout_type: string
   widgets: Widget[]
+  materialized: boolean
   created_at: string
   updated_at: string
 }
@@ -33,6 +34,8 @@ export interface KPIWidgetData {
 export interface ChartWidgetData {
   labels: string[]
   data: number[]
+  // Presente cuando top_n agrupó el resto: true en la entrada sintética
+  is_other?: boolean[]
 }
 
 export interface TableWidgetData {
@@ -59,12 +62,12 @@ export interface CreateDashboardPayload {
   data_id: string
   name: string
   widgets: Widget[]
+  materialized?: boolean
 }
 
 export const dashboardService = {
-  getAll: async (): Promise<Dashboard[]> => {
-    const response = await apiClient.get<Dashboard[]>('/api/dashboards/')
-    return response.data
+  list: async (cursor?: string, limit?: number): Promise<Page<Dashboard>> => {
+    return getPage<Dashboard>('/api/dashboards/', cursor, limit)
   },
 
   getData: async (id: string): Promise<DashboardData> => {
@@ -1,11 +1,10 @@
-import { apiClient } from '../client'
+import { apiClient, getPage, type Page } from '../client'
 
 export interface DataFile {
   data_id: string
   name: string
   num_rows: number
   num_columns: number
-  columns: string[]
   source_type: string
   created_at: string
 }
@@ -24,6 +23,7 @@ export interface ColumnAnalysis {
   sum?: number
   // Propiedades para columnas de texto
   unique_count?: number
+  unique_count_is_estimate?: boolean
   sample_values?: string[]
   is_categorical?: boolean
 }
@@ -58,10 +58,24 @@ export interface DataPreview {
   data: Record<string, any>[]
 }
 
+export interface UploadJob {
+  job_id: string
+  status: 'queued' | 'running' | 'succeeded' | 'failed'
+  filename: string
+  data_id: string | null
+  rows_processed: number
+  rows_per_second: number
+  error: string | null
+  created_at: string
+  started_at: string | null
+  finished_at: string | null
+}
+
+const JOB_POLL_INTERVAL_MS = 1000
+
 export const dataService = {
-  getAll: async (): Promise<DataFile[]> => {
-    const response = await apiClient.get<DataFile[]>('/api/data/')
-    return response.data
+  list: async (cursor?: string, limit?: number): Promise<Page<DataFile>> => {
+    return getPage<DataFile>('/api/data/', cursor, limit)
   },
 
   getById: async (id: string): Promise<DataFileDetail> => {
@@ -69,11 +83,11 @@ export const dataService = {
     return response.data
   },
 
-  upload: async (templateId: string, file: File): Promise<DataFile> => {
+  upload: async (templateId: string, file: File): Promise<UploadJob> => {
     const formData = new FormData()
     formData.append('file', file)
     
-    const response = await apiClient.post<DataFile>(
+    const response = await apiClient.post<{ job_id: string }>(
       `/api/data/upload/${templateId}`,
       formData,
       {
@@ -82,6 +96,21 @@ export const dataService = {
         },
       }
     )
+
+    // The upload is processed in the background; wait until it finishes
+    let job = await dataService.getJob(response.data.job_id)
+    while (job.status === 'queued' || job.status === 'running') {
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+      job = await dataService.getJob(job.job_id)
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error ?? 'Error al procesar el archivo')
+    }
+    return job
+  },
+
+  getJob: async (jobId: string): Promise<UploadJob> => {
+    const response = await apiClient.get<UploadJob>(`/api/data/jobs/${jobId}`)
     return response.data
   },
 
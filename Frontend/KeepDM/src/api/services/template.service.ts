@@ -1,4 +1,4 @@
-import { apiClient } from '../client'
+import { apiClient, getPage, type Page } from '../client'
 
 export interface Template {
   _id: string
@@ -15,9 +15,8 @@ export interface CreateTemplateRequest {
 }
 
 export const templateService = {
-  getAll: async (): Promise<Template[]> => {
-    const response = await apiClient.get<Template[]>('/api/templates/')
-    return response.data
+  list: async (cursor?: string, limit?: number): Promise<Page<Template>> => {
+    return getPage<Template>('/api/templates/', cursor, limit)
   },
 
   getById: async (id: string): Promise<Template> => {
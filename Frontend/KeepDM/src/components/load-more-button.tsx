@@ -0,0 +1,19 @@
+import { Button } from "@/components/ui/button"
+
+interface LoadMoreButtonProps {
+  hasMore: boolean
+  isLoading: boolean
+  onClick: () => void
+}
+
+export function LoadMoreButton({ hasMore, isLoading, onClick }: LoadMoreButtonProps) {
+  if (!hasMore) return null
+
+  return (
+    <div className="flex justify-center">
+      <Button type="button" variant="outline" onClick={onClick} disabled={isLoading}>
+        {isLoading ? "Cargando..." : "Cargar más"}
+      </Button>
+    </div>
+  )
+}
@@ -21,8 +21,10 @@ import {
 import { Input } from "@/components/ui/input"
 import { Label } from "@/components/ui/label"
 import { Upload, FileSpreadsheet } from "lucide-react"
-import { templateService, type Template } from "@/api/services/template.service"
+import { LoadMoreButton } from "@/components/load-more-button"
+import { templateService } from "@/api/services/template.service"
 import { dataService } from "@/api/services/data.service"
+import { usePaginatedList } from "@/hooks/use-paginated-list"
 
 interface UploadFileDialogProps {
   onUploadSuccess?: () => void
@@ -31,29 +33,23 @@ interface UploadFileDialogProps {
 
 export function UploadFileDialog({ onUploadSuccess, trigger }: UploadFileDialogProps) {
   const [open, setOpen] = useState(false)
-  const [templates, setTemplates] = useState<Template[]>([])
   const [selectedTemplateId, setSelectedTemplateId] = useState<string>("")
   const [selectedFile, setSelectedFile] = useState<File | null>(null)
   const [isLoading, setIsLoading] = useState(false)
-  const [isLoadingTemplates, setIsLoadingTemplates] = useState(true)
+  const {
+    items: templates,
+    hasMore,
+    isLoading: isLoadingTemplates,
+    isLoadingMore,
+    error: templatesError,
+    loadMore,
+  } = usePaginatedList(templateService.list, open)
 
   useEffect(() => {
-    const fetchTemplates = async () => {
-      try {
-        const data = await templateService.getAll()
-        setTemplates(data)
-      } catch (error) {
-        console.error("Error al cargar templates:", error)
-        toast.error("Error al cargar templates")
-      } finally {
-        setIsLoadingTemplates(false)
-      }
-    }
-
-    if (open) {
-      fetchTemplates()
+    if (templatesError) {
+      toast.error("Error al cargar templates")
     }
-  }, [open])
+  }, [templatesError])
 
   const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     const file = e.target.files?.[0]
@@ -178,6 +174,7 @@ export function UploadFileDialog({ onUploadSuccess, trigger }: UploadFileDialogP
                   </SelectContent>
                 </Select>
               )}
+              <LoadMoreButton hasMore={hasMore} isLoading={isLoadingMore} onClick={loadMore} />
             </div>
             <div className="grid gap-3">
               <Label htmlFor="file">Archivo</Label>
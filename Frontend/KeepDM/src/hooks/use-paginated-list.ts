@@ -0,0 +1,60 @@
+import * as React from "react"
+import type { Page } from "@/api/client"
+
+// Loads a cursor-paginated list one page at a time; fetchPage must be stable
+export function usePaginatedList<T>(
+  fetchPage: (cursor?: string) => Promise<Page<T>>,
+  enabled = true
+) {
+  const [items, setItems] = React.useState<T[]>([])
+  const [nextCursor, setNextCursor] = React.useState<string | undefined>(undefined)
+  const [isLoading, setIsLoading] = React.useState(true)
+  const [isLoadingMore, setIsLoadingMore] = React.useState(false)
+  const [error, setError] = React.useState<unknown>(null)
+
+  const reload = React.useCallback(async () => {
+    setIsLoading(true)
+    try {
+      const page = await fetchPage()
+      setItems(page.items)
+      setNextCursor(page.nextCursor)
+      setError(null)
+    } catch (err) {
+      console.error("Error al cargar la lista:", err)
+      setError(err)
+    } finally {
+      setIsLoading(false)
+    }
+  }, [fetchPage])
+
+  const loadMore = React.useCallback(async () => {
+    if (!nextCursor) return
+    setIsLoadingMore(true)
+    try {
+      const page = await fetchPage(nextCursor)
+      setItems((current) => [...current, ...page.items])
+      setNextCursor(page.nextCursor)
+    } catch (err) {
+      console.error("Error al cargar más elementos:", err)
+      setError(err)
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }, [fetchPage, nextCursor])
+
+  React.useEffect(() => {
+    if (enabled) {
+      reload()
+    }
+  }, [enabled, reload])
+
+  return {
+    items,
+    hasMore: nextCursor !== undefined,
+    isLoading,
+    isLoadingMore,
+    error,
+    loadMore,
+    reload,
+  }
+}
@@ -15,6 +15,15 @@ import { KPIWidget, BarWidget, LineWidget, AreaWidget, PieWidget, TableWidget }
 import { WidgetError } from "@/components/widgets/widget-error"
 import { exportElementToPdf } from "@/lib/export-to-pdf"
 
+// Nombre del grupo que agrupa el resto cuando el widget usa top_n
+const OTHER_DISPLAY_LABEL = "Otros (resto)"
+
+// El backend marca el grupo sintético en is_other; una categoría real "Other" no lo lleva
+const chartLabels = (chartData: ChartWidgetData) =>
+  chartData.labels.map((label, index) =>
+    chartData.is_other?.[index] ? OTHER_DISPLAY_LABEL : label
+  )
+
 export function DashboardDetail() {
   const { id } = useParams<{ id: string }>()
   const navigate = useNavigate()
@@ -103,7 +112,7 @@ export function DashboardDetail() {
           if (chartData.labels.length !== chartData.data.length) {
             return <WidgetError title={title} message="Las etiquetas y los datos no coinciden en cantidad" />
           }
-          const formattedData = chartData.labels.map((label, index) => ({
+          const formattedData = chartLabels(chartData).map((label, index) => ({
             label,
             value: chartData.data[index],
           }))
@@ -118,7 +127,7 @@ export function DashboardDetail() {
           if (chartData.labels.length !== chartData.data.length) {
             return <WidgetError title={title} message="Las etiquetas y los datos no coinciden en cantidad" />
           }
-          const formattedData = chartData.labels.map((label, index) => ({
+          const formattedData = chartLabels(chartData).map((label, index) => ({
             label,
             value: chartData.data[index],
           }))
@@ -133,7 +142,7 @@ export function DashboardDetail() {
           if (chartData.labels.length !== chartData.data.length) {
             return <WidgetError title={title} message="Las etiquetas y los datos no coinciden en cantidad" />
           }
-          const formattedData = chartData.labels.map((label, index) => ({
+          const formattedData = chartLabels(chartData).map((label, index) => ({
             label,
             value: chartData.data[index],
           }))
@@ -148,7 +157,7 @@ export function DashboardDetail() {
           if (chartData.labels.length !== chartData.data.length) {
             return <WidgetError title={title} message="Las etiquetas y los datos no coinciden en cantidad" />
           }
-          const formattedData = chartData.labels.map((label, index) => ({
+          const formattedData = chartLabels(chartData).map((label, index) => ({
             label,
             value: chartData.data[index],
           }))
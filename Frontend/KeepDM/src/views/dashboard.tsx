@@ -1,29 +1,20 @@
-import { useEffect, useState } from "react"
 import { useNavigate } from "react-router-dom"
 import { BarChart3, ChevronRight } from "lucide-react"
 import { Button } from "@/components/ui/button"
 import { DashboardEmpty } from "@/components/dashboard-empty"
-import { dashboardService, type Dashboard } from "@/api/services/dashboard.service"
+import { LoadMoreButton } from "@/components/load-more-button"
+import { dashboardService } from "@/api/services/dashboard.service"
+import { usePaginatedList } from "@/hooks/use-paginated-list"
 
 export function Dashboard() {
   const navigate = useNavigate()
-  const [dashboards, setDashboards] = useState<Dashboard[]>([])
-  const [isLoading, setIsLoading] = useState(true)
-
-  useEffect(() => {
-    const fetchDashboards = async () => {
-      try {
-        const data = await dashboardService.getAll()
-        setDashboards(data)
-      } catch (error) {
-        console.error("Error al cargar dashboards:", error)
-      } finally {
-        setIsLoading(false)
-      }
-    }
-
-    fetchDashboards()
-  }, [])
+  const {
+    items: dashboards,
+    hasMore,
+    isLoading,
+    isLoadingMore,
+    loadMore,
+  } = usePaginatedList(dashboardService.list)
 
   const handleCreateDashboard = () => {
     navigate("/upload")
@@ -38,7 +29,7 @@ export function Dashboard() {
             ? "Cargando tus dashboards..." 
             : dashboards.length === 0
             ? "No tienes dashboards creados"
-            : `Selecciona un dashboard para visualizar tus datos. ${dashboards.length} ${dashboards.length === 1 ? 'dashboard disponible' : 'dashboards disponibles'}.`
+            : `Selecciona un dashboard para visualizar tus datos. ${dashboards.length}${hasMore ? '+' : ''} ${dashboards.length === 1 && !hasMore ? 'dashboard disponible' : 'dashboards disponibles'}.`
           }
         </p>
       </div>
@@ -74,6 +65,8 @@ export function Dashboard() {
           ))}
         </div>
       )}
+
+      <LoadMoreButton hasMore={hasMore} isLoading={isLoadingMore} onClick={loadMore} />
     </div>
   )
 }
\ No newline at end of file
@@ -1,4 +1,3 @@
-import { useEffect, useState } from "react"
 import { useNavigate } from "react-router-dom"
 import { Plus } from "lucide-react"
 import {
@@ -9,29 +8,20 @@ import {
   CardTitle,
 } from "@/components/ui/card"
 import { Badge } from "@/components/ui/badge"
-import { templateService, type Template } from "@/api/services/template.service"
+import { LoadMoreButton } from "@/components/load-more-button"
+import { templateService } from "@/api/services/template.service"
+import { usePaginatedList } from "@/hooks/use-paginated-list"
 
 export function Templates() {
   const navigate = useNavigate()
-  const [templates, setTemplates] = useState<Template[]>([])
-  const [isLoading, setIsLoading] = useState(true)
-  const [error, setError] = useState<string | null>(null)
-
-  useEffect(() => {
-    const fetchTemplates = async () => {
-      try {
-        const data = await templateService.getAll()
-        setTemplates(data)
-      } catch (err) {
-        console.error("Error al cargar templates:", err)
-        setError("No se pudieron cargar los templates")
-      } finally {
-        setIsLoading(false)
-      }
-    }
-
-    fetchTemplates()
-  }, [])
+  const {
+    items: templates,
+    hasMore,
+    isLoading,
+    isLoadingMore,
+    error,
+    loadMore,
+  } = usePaginatedList(templateService.list)
 
   const formatDate = (dateString: string) => {
     const date = new Date(dateString)
@@ -70,12 +60,12 @@ export function Templates() {
     )
   }
 
-  if (error) {
+  if (error && templates.length === 0) {
     return (
       <div className="flex flex-1 flex-col gap-4 p-4 pt-0">
         <div className="flex flex-col gap-2">
           <h1 className="text-3xl font-bold">Templates</h1>
-          <p className="text-destructive">{error}</p>
+          <p className="text-destructive">No se pudieron cargar los templates</p>
         </div>
       </div>
     )
@@ -86,7 +76,7 @@ export function Templates() {
       <div className="flex flex-col gap-2">
         <h1 className="text-3xl font-bold">Templates</h1>
         <p className="text-muted-foreground">
-          Gestiona tus plantillas de datos. {templates.length} {templates.length === 1 ? 'template' : 'templates'} disponibles.
+          Gestiona tus plantillas de datos. {templates.length}{hasMore ? '+' : ''} {templates.length === 1 && !hasMore ? 'template' : 'templates'} disponibles.
         </p>
       </div>
 
@@ -136,6 +126,8 @@ export function Templates() {
           </CardContent>
         </Card>
       </div>
+
+      <LoadMoreButton hasMore={hasMore} isLoading={isLoadingMore} onClick={loadMore} />
     </div>
   )
 }
@@ -249,7 +249,7 @@ export function UploadDetail() {
                       {/* Estadísticas específicas para texto */}
                       {column.column_type === 'text' && (
                         <div className="mt-4 pt-4 border-t">
-                          <p className="text-xs text-muted-foreground mb-3">Valores únicos: {column.unique_count}</p>
+                          <p className="text-xs text-muted-foreground mb-3">Valores únicos: {column.unique_count_is_estimate ? '≈' : ''}{column.unique_count}</p>
                           {column.is_categorical && (
                             <Badge variant="secondary" className="mb-3">Categórica</Badge>
                           )}
@@ -29,8 +29,10 @@ import {
 import { UploadEmptyNoTemplates } from "@/components/upload-empty-no-templates"
 import { UploadEmptyNoFiles } from "@/components/upload-empty-no-files"
 import { UploadFileDialog } from "@/components/upload-file-dialog"
+import { LoadMoreButton } from "@/components/load-more-button"
 import { templateService } from "@/api/services/template.service"
 import { dataService, type DataFile } from "@/api/services/data.service"
+import { usePaginatedList } from "@/hooks/use-paginated-list"
 
 const formatDate = (dateString: string) => {
   const date = new Date(dateString)
@@ -58,38 +60,35 @@ const getSourceTypeBadge = (type?: string) => {
 export function Upload() {
   const navigate = useNavigate()
   const [hasTemplates, setHasTemplates] = useState(false)
-  const [dataFiles, setDataFiles] = useState<DataFile[]>([])
-  const [isLoading, setIsLoading] = useState(true)
+  const [isLoadingTemplates, setIsLoadingTemplates] = useState(true)
   const [sorting, setSorting] = useState<SortingState>([])
+  const {
+    items: dataFiles,
+    hasMore,
+    isLoading: isLoadingFiles,
+    isLoadingMore,
+    loadMore,
+    reload: refreshData,
+  } = usePaginatedList(dataService.list)
+  // Reloads after an upload keep showing the current rows
+  const isLoading = isLoadingTemplates || (isLoadingFiles && dataFiles.length === 0)
 
   useEffect(() => {
-    const fetchData = async () => {
+    const fetchTemplates = async () => {
       try {
-        const [templates, files] = await Promise.all([
-          templateService.getAll(),
-          dataService.getAll(),
-        ])
-        setHasTemplates(templates.length > 0)
-        setDataFiles(files)
+        // One template is enough to know whether uploads are possible
+        const page = await templateService.list(undefined, 1)
+        setHasTemplates(page.items.length > 0)
       } catch (error) {
-        console.error("Error al cargar datos:", error)
+        console.error("Error al cargar templates:", error)
       } finally {
-        setIsLoading(false)
+        setIsLoadingTemplates(false)
       }
     }
 
-    fetchData()
+    fetchTemplates()
   }, [])
 
-  const refreshData = async () => {
-    try {
-      const files = await dataService.getAll()
-      setDataFiles(files)
-    } catch (error) {
-      console.error("Error al refrescar datos:", error)
-    }
-  }
-
   const columns = useMemo<ColumnDef<DataFile>[]>(() => [
     {
       accessorKey: "name",
@@ -225,7 +224,7 @@ export function Upload() {
             ? "Importa datos desde archivos externos"
             : dataFiles.length === 0
             ? "Importa datos desde archivos externos"
-            : `Gestiona tus archivos de datos. ${dataFiles.length} ${dataFiles.length === 1 ? 'archivo' : 'archivos'} disponibles.`
+            : `Gestiona tus archivos de datos. ${dataFiles.length}${hasMore ? '+' : ''} ${dataFiles.length === 1 && !hasMore ? 'archivo' : 'archivos'} disponibles.`
           }
         </p>
       </div>
@@ -298,6 +297,8 @@ export function Upload() {
               </TableBody>
             </Table>
           </div>
+
+          <LoadMoreButton hasMore={hasMore} isLoading={isLoadingMore} onClick={loadMore} />
         </>
       )}
     </div>